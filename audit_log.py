@@ -0,0 +1,197 @@
+import argparse
+import atexit
+import glob
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+from metrics import span
+
+# Defaults
+LOG_FILE = "lockscreen_log.txt"
+LOG_FORMAT = "%(asctime)s - %(message)s"
+MAX_BYTES = 1 << 20  # Rotate once the current segment reaches 1 MiB...
+MAX_AGE = 7 * 24 * 3600  # ...or a week, whichever comes first
+BACKUP_COUNT = 10
+COMPRESS = False
+IDLE_CHECK = 60.0  # Seconds between rotation checks while nothing is logged
+ATTEMPT_GAP = 0.001  # Pause between attempts in the benchmark
+
+
+class AuditWriter:
+    """Background thread that drains queued log records into a rotating file
+
+    Each wake writes every record already queued in one go and flushes once.
+    Rotated segments are renamed with their start time (gzipped if compress is
+    set) and only the newest backup_count are kept. A segment that can't be
+    renamed (e.g. held open elsewhere on Windows) is rotated on a later batch.
+    """
+
+    def __init__(self, path=LOG_FILE, max_bytes=MAX_BYTES, max_age=MAX_AGE,
+                 backup_count=BACKUP_COUNT, compress=COMPRESS, fmt=LOG_FORMAT):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backup_count = backup_count
+        self.compress = compress
+        self.formatter = logging.Formatter(fmt)
+        self.queue = queue.SimpleQueue()
+        self.batches = 0
+        self.records = 0
+        self._open()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        # An existing log started when its first line was written; its mtime is a fair stand-in
+        self.started = os.path.getmtime(self.path) if self.file.tell() else time.time()
+
+    def _run(self):
+        while True:
+            try:
+                record = self.queue.get(timeout=IDLE_CHECK)
+            except queue.Empty:
+                self._maybe_rotate()
+                continue
+            batch = [record]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            self._write([record for record in batch if record is not None])
+            if stop:
+                self.file.close()
+                return
+
+    def _write(self, records):
+        if records:
+            with span("log_write"):
+                self.file.write("".join(self.formatter.format(record) + "\n" for record in records))
+                self.file.flush()
+            self.batches += 1
+            self.records += len(records)
+        self._maybe_rotate()
+
+    def _maybe_rotate(self):
+        if self.file.tell() < self.max_bytes and time.time() - self.started < self.max_age:
+            return
+        if not self.file.tell():
+            return  # Never rotate out an empty segment
+        base, ext = os.path.splitext(self.path)
+        rotated = f"{base}.{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))}{ext}"
+        self.file.close()
+        try:
+            os.replace(self.path, rotated)
+        except OSError:
+            self.file = open(self.path, "a", encoding="utf-8")
+            return
+        self._open()
+        if self.compress:
+            with open(rotated, "rb") as source, gzip.open(rotated + ".gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(rotated)
+        self._prune(base, ext)
+
+    def _prune(self, base, ext):
+        segments = sorted(glob.glob(f"{glob.escape(base)}.*-*{ext}") + glob.glob(f"{glob.escape(base)}.*-*{ext}.gz"))
+        for old in segments[:-self.backup_count] if self.backup_count else segments:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def close(self, timeout=5.0):
+        """Write everything still queued and stop the thread"""
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout)
+
+
+class _AuditQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the writer thread"""
+
+    def emit(self, record):
+        with span("log_enqueue"):
+            super().emit(record)
+
+    def prepare(self, record):
+        # Resolve arguments and tracebacks now, while they're still valid; the rest is the writer's job
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_audit_log(path=LOG_FILE, level=logging.INFO, **options):
+    """Route the root logger through a queue to an AuditWriter; returns the writer
+
+    Logging calls on the caller's thread only build a record and enqueue it.
+    """
+    writer = AuditWriter(path, **options)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_AuditQueueHandler(writer.queue))
+    atexit.register(writer.close)
+    return writer
+
+
+def benchmark(attempts):
+    """Main-thread time (µs) per failed attempt, synchronous file handler vs queued writer"""
+    results = {}
+    directory = tempfile.mkdtemp()
+    logger = logging.getLogger("audit_benchmark")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    try:
+        for name in ("sync", "queued"):
+            path = os.path.join(directory, f"{name}.txt")
+            if name == "sync":
+                handler = logging.FileHandler(path)  # What logging.basicConfig(filename=...) installs
+                handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            else:
+                writer = AuditWriter(path)
+                handler = _AuditQueueHandler(writer.queue)
+            logger.addHandler(handler)
+            times = np.empty(attempts)
+            for i in range(attempts):
+                # Same record handle_failed_attempt logs
+                start = time.perf_counter_ns()
+                logger.warning(f"Failed authentication attempt: Incorrect password or typing pattern (Score: {i % 100 / 100:.2f}) doesn't match!")
+                times[i] = (time.perf_counter_ns() - start) / 1000
+                time.sleep(ATTEMPT_GAP)  # Attempts are seconds apart in practice; let the writer catch up
+            logger.removeHandler(handler)
+            handler.close()
+            if name == "queued":
+                writer.close()
+            results[name] = times
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure main-thread logging cost per authentication attempt")
+    parser.add_argument("--bench", action="store_true", help="Compare synchronous file logging with the queued writer")
+    parser.add_argument("--attempts", type=int, default=2000)
+    args = parser.parse_args()
+
+    if not args.bench:
+        parser.print_help()
+    else:
+        results = benchmark(args.attempts)
+        for name, times in results.items():
+            p50, p99 = np.percentile(times, [50, 99])
+            print(f"{name:<7} mean {times.mean():7.2f} µs  p50 {p50:7.2f} µs  p99 {p99:7.2f} µs  max {times.max():8.2f} µs")
+        saved = results["sync"].mean() - results["queued"].mean()
+        print(f"Main thread saves {saved:.2f} µs per attempt on average")
@@ -0,0 +1,397 @@
+import argparse
+import json
+import os
+import pickle
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from capture import KeystrokeBuffer
+from log_tailer import LogTailer
+from matrix_rain import MatrixRain
+from scoring import score_batch
+from template import save_template, load_template
+from template_store import TemplateStore
+from train_auth import PASSWORD, build_model, leave_one_out_scores
+from verify_core import REPORT_BAND, fit_scaler, scale_features, standardize, verify, verify_decisions
+from workload import synthetic_users
+
+# Defaults
+RESULTS_DIR = "bench_results"
+TEMPLATE_SIZES = (5, 50, 500)
+LOG_LINES = 200000  # Size of the synthetic lockscreen log
+BULK_ATTEMPTS = 10000  # Attempts re-scored at once by the bulk benchmarks
+MIN_RUN_SECONDS = 0.05  # Each timed repeat runs the benchmark at least this long
+REPEATS = 5
+REGRESSION_RATIO = 1.2  # Slowdown reported as a regression by --compare
+SEED = 1234
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a setup function returning the callable to time (or None to skip)"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _user(n_rows, seed=SEED):
+    return synthetic_users(1, len(PASSWORD) - 1, n_rows + 1, seed)[0]
+
+
+@benchmark("capture.keystroke_features")
+def bench_capture(workdir):
+    buffer = KeystrokeBuffer()
+    times = np.cumsum(np.full(len(PASSWORD), 120_000_000))
+
+    def run():
+        buffer.clear()
+        for char, t in zip(PASSWORD, times.tolist()):
+            buffer.press(char, t)
+            buffer.release(char, t + 80_000_000)
+        return buffer.intervals(), buffer.hold_times()
+    return run
+
+
+@benchmark("scale.standard_scaler")
+def bench_standard_scaler(workdir):
+    try:
+        from sklearn.preprocessing import StandardScaler
+    except ImportError:
+        return None
+    data = _user(50)
+    scaler = StandardScaler().fit(data[:-1])
+    attempt = data[-1:]
+    return lambda: scaler.transform(attempt)
+
+
+@benchmark("scale.numpy")
+def bench_numpy_scale(workdir):
+    data = _user(50)
+    mean, scale = fit_scaler(data[:-1])
+    attempt = data[-1:]
+    return lambda: scale_features(attempt, mean, scale)
+
+
+@benchmark("scale.folded")
+def bench_folded_scale(workdir):
+    data = _user(50)
+    model = build_model(data[:-1], calibrate=False)
+    attempt = data[-1:]
+    return lambda: standardize(attempt, model)
+
+
+def _bench_scoring(n_rows):
+    def setup(workdir):
+        data = _user(n_rows)
+        model = build_model(data[:-1], calibrate=False)
+        return model, data[-1:]
+    return setup
+
+
+def _bulk_setup(n_rows):
+    """A template plus BULK_ATTEMPTS genuine and impostor attempts, thresholded at its mean self-similarity"""
+    users = synthetic_users(2, len(PASSWORD) - 1, n_rows + BULK_ATTEMPTS // 2, SEED)
+    model = build_model(users[0, :n_rows], calibrate=False)
+    return model, np.concatenate([users[0, n_rows:], users[1, n_rows:]])
+
+
+for _n in TEMPLATE_SIZES:
+    def _make(n):
+        setup = _bench_scoring(n)
+
+        @benchmark(f"score.row_loop[{n}]")
+        def bench_row_loop(workdir):
+            model, attempt = setup(workdir)
+            scaled = scale_features(attempt, model["mean"], model["scale"])[0]
+            rows = np.asarray(model["train_data"])
+
+            def run():
+                # The per-row loop the lockscreen used before batch scoring
+                distances = [np.sqrt(np.sum((scaled - row) ** 2)) for row in rows]
+                return 1 / (1 + np.mean(distances))
+            return run
+
+        @benchmark(f"score.batch[{n}]")
+        def bench_batch(workdir):
+            model, attempt = setup(workdir)
+            scaled = scale_features(attempt, model["mean"], model["scale"])
+            return lambda: score_batch(scaled, model["train_data"])
+
+        @benchmark(f"score.verify[{n}]")
+        def bench_verify(workdir):
+            model, attempt = setup(workdir)
+            return lambda: verify(attempt, model, 0.2)
+
+        @benchmark(f"score.verify_decisions[{n}]")
+        def bench_decisions(workdir):
+            model, attempt = setup(workdir)
+            return lambda: verify_decisions(attempt, model, 0.2)
+
+        @benchmark(f"score.bulk_verify[{n}]")
+        def bench_bulk_verify(workdir):
+            model, attempts = _bulk_setup(n)
+            return lambda: verify(attempts, model, model["avg_self_similarity"])[1]
+
+        @benchmark(f"score.bulk_cascade[{n}]")
+        def bench_bulk_cascade(workdir):
+            model, attempts = _bulk_setup(n)
+            return lambda: verify_decisions(attempts, model, model["avg_self_similarity"])
+
+        @benchmark(f"score.bulk_band_cascade[{n}]")
+        def bench_bulk_band(workdir):
+            model, attempts = _bulk_setup(n)
+            return lambda: verify_decisions(attempts, model, model["avg_self_similarity"], REPORT_BAND)
+
+        @benchmark(f"train.leave_one_out[{n}]")
+        def bench_loo(workdir):
+            model, _ = setup(workdir)
+            train_data = np.asarray(model["train_data"])
+            return lambda: leave_one_out_scores(train_data)
+    _make(_n)
+
+
+@benchmark("train.build_model")
+def bench_build_model(workdir):
+    data = _user(5)[:5]
+    return lambda: build_model(data)
+
+
+def _legacy_pickle(workdir):
+    """A template as train_auth used to pickle it, fitted sklearn StandardScaler included; None without sklearn"""
+    try:
+        from sklearn.preprocessing import StandardScaler
+    except ImportError:
+        return None
+    path = os.path.join(workdir, "typing_model.pkl")
+    data = _user(50)[:50]
+    scaler = StandardScaler()
+    scaled = scaler.fit_transform(data)
+    self_similarities = leave_one_out_scores(scaled)
+    with open(path, "wb") as file:
+        pickle.dump({
+            "train_data": scaled,
+            "scaler": scaler,
+            "avg_self_similarity": np.mean(self_similarities),
+            "min_self_similarity": np.min(self_similarities),
+        }, file)
+    return path
+
+
+def _template_file(workdir):
+    path = os.path.join(workdir, "typing_model.kst")
+    save_template(path, build_model(_user(50)[:50], calibrate=False))
+    return path
+
+
+def _fresh_interpreter(code):
+    """Callable running code in a new interpreter, so every import the load triggers is paid each time"""
+    command = [sys.executable, "-c", code]
+    here = os.path.dirname(os.path.abspath(__file__))
+    return lambda: subprocess.run(command, cwd=here, check=True)
+
+
+@benchmark("load.pickle")
+def bench_load_pickle(workdir):
+    path = _legacy_pickle(workdir)
+    if path is None:
+        return None
+
+    def run():
+        with open(path, "rb") as file:
+            return pickle.load(file)
+    return run
+
+
+@benchmark("load.template")
+def bench_load_template(workdir):
+    path = _template_file(workdir)
+    return lambda: load_template(path)
+
+
+@benchmark("load.cold.interpreter")
+def bench_cold_interpreter(workdir):
+    # Startup cost shared by the cold loads below; subtract it to compare them
+    return _fresh_interpreter("pass")
+
+
+@benchmark("load.cold.pickle")
+def bench_cold_pickle(workdir):
+    path = _legacy_pickle(workdir)
+    if path is None:
+        return None
+    # What the lockscreen paid at startup: unpickling the scaler imports sklearn
+    return _fresh_interpreter(f"import pickle\nwith open({path!r}, 'rb') as file:\n    pickle.load(file)")
+
+
+@benchmark("load.cold.template")
+def bench_cold_template(workdir):
+    path = _template_file(workdir)
+    return _fresh_interpreter(f"from template import load_template\nload_template({path!r})")
+
+
+@benchmark("load.store_cached")
+def bench_store_cached(workdir):
+    store = TemplateStore(os.path.join(workdir, "templates"))
+    store.put("bench", build_model(_user(50)[:50], calibrate=False))
+    store.get("bench")
+    return lambda: store.get("bench")
+
+
+def _write_log(path, lines):
+    line = "2026-01-01 00:00:00,000 - Failed authentication attempt: Incorrect password or typing pattern (Score: 0.05) doesn't match!\n"
+    with open(path, "w") as file:
+        file.write(line * lines)
+    return line
+
+
+@benchmark("tail.full_reread")
+def bench_full_reread(workdir):
+    path = os.path.join(workdir, "reread_log.txt")
+    line = _write_log(path, LOG_LINES)
+
+    def run():
+        # What iot_monitor did before the tailer: reread the whole file, keep the new lines
+        with open(path, "a") as file:
+            file.write(line)
+        with open(path) as file:
+            return file.readlines()[-1:]
+    return run
+
+
+@benchmark("tail.offset")
+def bench_tail_offset(workdir):
+    path = os.path.join(workdir, "tail_log.txt")
+    line = _write_log(path, LOG_LINES)
+    tailer = LogTailer(path)
+    tailer.read_new()
+
+    def run():
+        with open(path, "a") as file:
+            file.write(line)
+        return tailer.read_new()
+    return run
+
+
+@benchmark("rain.frame")
+def bench_rain_frame(workdir):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:
+        return None  # Needs a display; run under xvfb-run on headless machines
+    root.withdraw()
+    canvas = tk.Canvas(root, width=1920, height=1080)
+    rain = MatrixRain(canvas, 1920, 1080, seed=SEED)
+
+    def run():
+        rain.step()
+        root.update_idletasks()
+    return run
+
+
+def time_callable(fn, min_seconds=MIN_RUN_SECONDS, repeats=REPEATS):
+    """(number of calls per repeat, seconds per call of each repeat)"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_seconds / elapsed) + 1))
+    runs = [elapsed / number]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - start) / number)
+    return number, runs
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(pattern=None, min_seconds=MIN_RUN_SECONDS, repeats=REPEATS):
+    """Run every (matching) benchmark; returns the JSON-ready result document"""
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="keystroke_bench_")
+    try:
+        for name, setup in BENCHMARKS.items():
+            if pattern and pattern not in name:
+                continue
+            fn = setup(workdir)
+            if fn is None:
+                results[name] = {"skipped": True}
+                print(f"{name:<36} skipped")
+                continue
+            number, runs = time_callable(fn, min_seconds, repeats)
+            runs_us = np.array(runs) * 1e6
+            results[name] = {"median_us": float(np.median(runs_us)), "min_us": float(runs_us.min()),
+                             "number": number, "repeats": repeats}
+            print(f"{name:<36} {np.median(runs_us):12.2f} µs  (min {runs_us.min():.2f}, {number} calls x {repeats})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(baseline_path, current_path, ratio=REGRESSION_RATIO):
+    """Print per-benchmark speed ratios; returns the names that regressed"""
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    with open(current_path) as file:
+        current = json.load(file)
+    print(f"{'benchmark':<36}{baseline['commit']:>12}{current['commit']:>12}   ratio")
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before or before.get("skipped") or result.get("skipped"):
+            continue
+        change = result["median_us"] / before["median_us"]
+        flag = ""
+        if change > ratio:
+            flag = "  ❌ slower"
+            regressions.append(name)
+        elif change < 1 / ratio:
+            flag = "  ✅ faster"
+        print(f"{name:<36}{before['median_us']:>12.2f}{result['median_us']:>12.2f}   {change:5.2f}x{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the authentication pipeline's hot paths")
+    parser.add_argument("-k", dest="pattern", help="Only benchmarks whose name contains this")
+    parser.add_argument("--output", help=f"Result file (default {RESULTS_DIR}/<commit>.json)")
+    parser.add_argument("--min-time", type=float, default=MIN_RUN_SECONDS)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare)
+        sys.exit(1 if regressions else 0)
+
+    document = run_suite(args.pattern, args.min_time, args.repeats)
+    output = args.output or os.path.join(RESULTS_DIR, f"{document['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(document, file, indent=2)
+    print(f"\n📊 Results written to {output}")
@@ -0,0 +1,175 @@
+import argparse
+import heapq
+import queue
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+# Defaults
+BLYNK_SERVER = "https://blynk.cloud"
+BATCH_PATH = "/external/api/batch/update"
+TIMEOUT = 5
+MAX_RETRIES = 3
+BACKOFF = 0.25  # Seconds before the first retry, doubled after each failure
+MAX_BACKOFF = 2.0
+
+
+class BlynkNotifier:
+    """Sends virtual-pin updates from a background thread over one keep-alive session
+
+    Updates that are ready at the same moment go out as a single batch request,
+    timed updates (e.g. switching an LED back off) are scheduled instead of
+    slept for, and failed requests are retried with bounded exponential backoff.
+    Callers never wait on the network.
+    """
+
+    def __init__(self, token, server=BLYNK_SERVER, timeout=TIMEOUT, max_retries=MAX_RETRIES):
+        self.token = token
+        self.url = server.rstrip("/") + BATCH_PATH
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.mount(server, HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._queue = queue.Queue()
+        self._scheduled = []  # Heap of (due time, sequence, pins); only touched by the worker
+        self._sequence = 0
+        self.sent = 0
+        self.failed = 0
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def update(self, pins):
+        """Queue pin values, e.g. {"V1": 1}, for sending as soon as possible"""
+        self._queue.put((0.0, dict(pins)))
+
+    def schedule(self, delay, pins):
+        """Queue pin values to be sent after delay seconds"""
+        self._queue.put((delay, dict(pins)))
+
+    def close(self, timeout=None):
+        """Send everything that is due, drop the rest and stop the worker"""
+        self._queue.put(None)
+        self._worker.join(timeout)
+        self.session.close()
+
+    def _run(self):
+        while True:
+            timeout = None
+            if self._scheduled:
+                timeout = max(0.0, self._scheduled[0][0] - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                return
+
+            # Take everything else already queued so it can share a request
+            items = [item] if item else []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._flush(items)
+                    return
+                items.append(item)
+            self._flush(items)
+
+    def _flush(self, items):
+        now = time.monotonic()
+        for delay, pins in items:
+            self._sequence += 1
+            heapq.heappush(self._scheduled, (now + delay, self._sequence, pins))
+
+        batch = {}
+        while self._scheduled and self._scheduled[0][0] <= now:
+            _, _, pins = heapq.heappop(self._scheduled)
+            for pin, value in pins.items():
+                if pin in batch and batch[pin] != value:
+                    # A pin changing twice (e.g. blink on/off) must not collapse into one request
+                    self._send(batch)
+                    batch = {}
+                batch[pin] = value
+        if batch:
+            self._send(batch)
+
+    def _send(self, pins):
+        params = {"token": self.token, **pins}
+        delay = BACKOFF
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.get(self.url, params=params, timeout=self.timeout)
+                if response.status_code < 500:
+                    if response.status_code >= 400:
+                        print(f"⚠️ Blynk rejected update {pins}: HTTP {response.status_code}")
+                    self.sent += 1
+                    return True
+            except requests.RequestException as e:
+                error = e
+            else:
+                error = f"HTTP {response.status_code}"
+            if attempt < self.max_retries:
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_BACKOFF)
+        print(f"⚠️ Blynk error: {error}")
+        self.failed += 1
+        return False
+
+
+def serve_stub(port=0):
+    """Local stand-in for the Blynk HTTP API that records every request it gets"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qsl, urlsplit
+
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            received.append((time.monotonic(), url.path, dict(parse_qsl(url.query))))
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, received
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exercise BlynkNotifier against a local stand-in server")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--serve", action="store_true", help="Only run the stand-in server (point iot_monitor at it)")
+    args = parser.parse_args()
+
+    server, received = serve_stub(args.port)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    if args.serve:
+        print(f"Blynk stand-in listening on {base}; set BLYNK_SERVER={base}")
+        try:
+            while True:
+                time.sleep(1)
+                while received:
+                    print(received.pop(0))
+        except KeyboardInterrupt:
+            pass
+    else:
+        notifier = BlynkNotifier("test-token", server=base)
+        start = time.monotonic()
+        notifier.update({"V1": 0, "V3": 0, "V2": 1})
+        notifier.schedule(0.2, {"V2": 0})
+        enqueue_ms = (time.monotonic() - start) * 1000
+        time.sleep(0.5)
+        notifier.close()
+        server.shutdown()
+        for at, path, params in received:
+            print(f"+{(at - start) * 1000:6.1f} ms {path} {params}")
+        print(f"Enqueue took {enqueue_ms:.2f} ms; {len(received)} requests, {notifier.failed} failures")
@@ -0,0 +1,228 @@
+import argparse
+import os
+import sys
+import numpy as np
+from verify_core import fit_scaler, scale_features, verify
+from config_store import get_config
+from scorers import DEFAULT_SCORER, get_scorer
+
+# Defaults
+CONFIGURED = "configured"  # calibrate_model's default target_far: the config file's "target_far"
+IMPOSTOR_POOL_FILE = "impostor_pool.npy"
+IMPOSTOR_POOL_SIZE = 2000
+IMPOSTOR_POOL_SEED = 20240601
+BOOTSTRAP_ROUNDS = 1000
+BOOTSTRAP_BLOCK = 250  # Bootstrap rounds evaluated per vectorized step
+CONFIDENCE = 0.95
+MIN_CALIBRATION_SAMPLES = 10  # Smaller enrolments keep the global threshold: too few genuine scores to place one
+FRR_TOLERANCE = 0.05  # --check fails when measured and reported FRR differ by more than this
+
+
+def error_rates(genuine, impostor, threshold):
+    """(FAR, FRR) at a fixed threshold"""
+    far = float(np.mean(impostor >= threshold)) if len(impostor) else 0.0
+    frr = float(np.mean(genuine < threshold)) if len(genuine) else 0.0
+    return far, frr
+
+
+def det_curve(genuine, impostor):
+    """FAR and FRR at every candidate threshold, from one sort of each score set"""
+    genuine = np.sort(genuine)
+    impostor = np.sort(impostor)
+    thresholds = np.unique(np.concatenate([genuine, impostor]))
+    frr = np.searchsorted(genuine, thresholds, side="left") / len(genuine)
+    far = 1 - np.searchsorted(impostor, thresholds, side="left") / len(impostor)
+    return thresholds, far, frr
+
+
+def _pick(thresholds, far, frr, target_far):
+    """Index of the calibrated threshold along the last axis"""
+    if target_far is None:
+        return np.argmin(np.abs(far - frr), axis=-1)
+    # FAR falls as the threshold rises: take the first threshold that meets the target,
+    # or the strictest one available if none does
+    meets = far <= target_far
+    return np.where(meets.any(axis=-1), np.argmax(meets, axis=-1), far.shape[-1] - 1)
+
+
+def equal_error_rate(genuine, impostor):
+    """(EER, threshold) where FAR and FRR cross"""
+    if not len(genuine) or not len(impostor):
+        return float("nan"), float("nan")
+    thresholds, far, frr = det_curve(genuine, impostor)
+    i = _pick(thresholds, far, frr, None)
+    return float((far[i] + frr[i]) / 2), float(thresholds[i])
+
+
+def score_histogram(scores, bins):
+    """Counts of similarity scores on a fixed grid of bins equal-width bins over [0, 1]"""
+    index = np.clip((np.asarray(scores) * bins).astype(np.int64), 0, bins - 1)
+    return np.bincount(index, minlength=bins)
+
+
+def histogram_equal_error_rate(genuine_counts, impostor_counts):
+    """(EER, threshold) from score_histogram counts; thresholds resolve to the bin width"""
+    n_genuine, n_impostor = genuine_counts.sum(), impostor_counts.sum()
+    if not n_genuine or not n_impostor:
+        return float("nan"), float("nan")
+    bins = len(genuine_counts)
+    # Threshold k / bins: genuine scores in lower bins are rejected, impostor scores from bin k up accepted
+    frr = np.concatenate([[0], np.cumsum(genuine_counts)[:-1]]) / n_genuine
+    far = 1 - np.concatenate([[0], np.cumsum(impostor_counts)[:-1]]) / n_impostor
+    i = _pick(None, far, frr, None)
+    return float((far[i] + frr[i]) / 2), float(i / bins)
+
+
+def calibrate_threshold(genuine, impostor, target_far=None):
+    """Threshold at the EER, or the loosest one meeting a target FAR"""
+    thresholds, far, frr = det_curve(genuine, impostor)
+    return float(thresholds[_pick(thresholds, far, frr, target_far)])
+
+
+def _resample_counts(rng, n, rounds):
+    """How often each of n samples is drawn in each bootstrap round"""
+    draws = rng.integers(0, n, size=(rounds, n)) + np.arange(rounds)[:, None] * n
+    return np.bincount(draws.ravel(), minlength=rounds * n).reshape(rounds, n)
+
+
+def bootstrap_threshold(genuine, impostor, target_far=None, rounds=BOOTSTRAP_ROUNDS,
+                        confidence=CONFIDENCE, seed=None):
+    """Confidence bounds on the calibrated threshold
+
+    Resampling with replacement is the same as drawing multinomial counts over
+    the sorted scores, so every round's DET curve is a cumulative sum over one
+    shared threshold grid and whole blocks of rounds are evaluated at once.
+    """
+    rng = np.random.default_rng(seed)
+    genuine = np.sort(genuine)
+    impostor = np.sort(impostor)
+    n_genuine, n_impostor = len(genuine), len(impostor)
+    thresholds = np.unique(np.concatenate([genuine, impostor]))
+    # Number of original scores strictly below each candidate threshold
+    genuine_below = np.searchsorted(genuine, thresholds, side="left")
+    impostor_below = np.searchsorted(impostor, thresholds, side="left")
+
+    picks = []
+    for start in range(0, rounds, BOOTSTRAP_BLOCK):
+        block = min(BOOTSTRAP_BLOCK, rounds - start)
+        genuine_counts = _resample_counts(rng, n_genuine, block)
+        impostor_counts = _resample_counts(rng, n_impostor, block)
+        genuine_cum = np.concatenate([np.zeros((block, 1)), np.cumsum(genuine_counts, axis=1)], axis=1)
+        impostor_cum = np.concatenate([np.zeros((block, 1)), np.cumsum(impostor_counts, axis=1)], axis=1)
+        frr = genuine_cum[:, genuine_below] / n_genuine
+        far = 1 - impostor_cum[:, impostor_below] / n_impostor
+        picks.append(thresholds[_pick(thresholds, far, frr, target_far)])
+
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(np.concatenate(picks), [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def impostor_pool(n_features, size=IMPOSTOR_POOL_SIZE, path=IMPOSTOR_POOL_FILE):
+    """Raw interval vectors from other typists, used as impostor attempts
+
+    A recorded pool is used when impostor_pool.npy with the right width is
+    present. Otherwise a fixed-seed population of workload typists types it,
+    so the pool is identical on every machine.
+    """
+    if os.path.exists(path):
+        pool = np.load(path, mmap_mode="r")
+        if pool.ndim == 2 and pool.shape[1] == n_features:
+            return pool
+    from workload import UserModels
+
+    n_typists = max(1, size // 20)
+    models = UserModels(IMPOSTOR_POOL_SEED, 0, n_typists, n_features)
+    rng = np.random.default_rng([IMPOSTOR_POOL_SEED, 1, n_features])
+    return models.sample(rng, rng.integers(0, n_typists, size=size), rng.random(size))
+
+
+def held_out_scores(train_data, scorer=DEFAULT_SCORER):
+    """Genuine scores for calibration: each enrolment attempt against a scaler and scorer fitted without it
+
+    The model's own leave-one-out scores are optimistic because its scaler
+    has already seen the held-out attempt; thresholds placed on them reject
+    the genuine user far more often than they report.
+    """
+    train_data = np.asarray(train_data, dtype=np.float64)
+    scores = np.empty(len(train_data))
+    rest = np.ones(len(train_data), dtype=bool)
+    for i in range(len(train_data)):
+        rest[i] = False
+        mean, scale = fit_scaler(train_data[rest])
+        fitted = get_scorer(scorer)(-mean / scale).fit(scale_features(train_data[rest], mean, scale))
+        scores[i] = fitted.score(scale_features(train_data[i], mean, scale))
+        rest[i] = True
+    return scores
+
+
+def calibrate_model(model, impostor=None, target_far=CONFIGURED, seed=None):
+    """Store a per-user threshold (with bootstrap bounds) in a freshly built model"""
+    if target_far == CONFIGURED:
+        target_far = get_config().get("target_far")
+    train_data = np.asarray(model["train_data"])
+    if len(train_data) < MIN_CALIBRATION_SAMPLES:
+        return model
+    raw_train_data = train_data * model["scale"] + model["mean"]
+    genuine = held_out_scores(raw_train_data, model.get("scorer", DEFAULT_SCORER))
+    if impostor is None:
+        impostor = impostor_pool(model["train_data"].shape[1])
+    impostor_scores, _ = verify(impostor, model, 0)
+
+    threshold = calibrate_threshold(genuine, impostor_scores, target_far)
+    low, high = bootstrap_threshold(genuine, impostor_scores, target_far, seed=seed)
+    eer, _ = equal_error_rate(genuine, impostor_scores)
+    far, frr = error_rates(genuine, impostor_scores, threshold)
+    model.update({
+        "threshold": threshold,
+        "threshold_low": low,
+        "threshold_high": high,
+        "target_far": target_far,
+        "calibration_eer": eer,
+        "calibration_far": far,
+        "calibration_frr": frr,
+    })
+    return model
+
+
+def check_calibration(enrol_sizes=(MIN_CALIBRATION_SAMPLES, 20, 50), n_users=40, fresh=200, n_features=10, seed=0):
+    """Reported vs measured error rates of calibrated thresholds on fresh attempts
+
+    Returns {enrolment size: (reported FRR, measured FRR, reported FAR,
+    measured FAR)}, each averaged over users. Fresh genuine attempts come
+    from the enrolled typist, impostor attempts from the other typists.
+    """
+    from train_auth import build_model
+    from workload import UserModels
+
+    models = UserModels(seed, 0, n_users, n_features)
+    rng = np.random.default_rng([seed, 2])
+    results = {}
+    for size in enrol_sizes:
+        rates = []
+        for u in range(n_users):
+            enrolment = models.sample(rng, np.full(size, u), np.zeros(size))
+            model = build_model(enrolment)
+            genuine = models.sample(rng, np.full(fresh, u), np.zeros(fresh))
+            others = np.delete(np.arange(n_users), u)
+            impostor = models.sample(rng, rng.choice(others, size=fresh), np.zeros(fresh))
+            threshold = model["threshold"]
+            far, frr = error_rates(verify(genuine, model, 0)[0], verify(impostor, model, 0)[0], threshold)
+            rates.append((model["calibration_frr"], frr, model["calibration_far"], far))
+        results[size] = tuple(float(x) for x in np.mean(rates, axis=0))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that calibrated thresholds deliver the error rates they report")
+    parser.add_argument("--check", action="store_true", required=True)
+    parser.add_argument("--users", type=int, default=40)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'enrolment':>10}{'FRR rep':>9}{'FRR meas':>10}{'FAR rep':>9}{'FAR meas':>10}")
+    for size, (frr_reported, frr_measured, far_reported, far_measured) in check_calibration(n_users=args.users).items():
+        ok = abs(frr_measured - frr_reported) <= FRR_TOLERANCE
+        failed = failed or not ok
+        print(f"{size:>10}{frr_reported:>9.3f}{frr_measured:>10.3f}{far_reported:>9.3f}{far_measured:>10.3f}  {'✅' if ok else '❌'}")
+    sys.exit(1 if failed else 0)
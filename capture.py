@@ -0,0 +1,219 @@
+import argparse
+import queue
+import threading
+import time
+from collections import deque
+import numpy as np
+
+# One record per keystroke; release_ns stays 0 until the key is released
+RECORD_DTYPE = np.dtype([("key", "<u4"), ("press_ns", "<i8"), ("release_ns", "<i8")])
+CAPACITY = 256  # Records preallocated up front; far longer than any password
+
+
+class KeystrokeBuffer:
+    """Preallocated keystroke records timed with the monotonic perf_counter_ns clock"""
+
+    def __init__(self, capacity=CAPACITY):
+        self._records = np.zeros(capacity, dtype=RECORD_DTYPE)
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def press(self, key, timestamp_ns=None):
+        """Record a key press (O(1))"""
+        if timestamp_ns is None:
+            timestamp_ns = time.perf_counter_ns()
+        if self._length == len(self._records):
+            # Only reached by absurdly long input; doubling keeps appends amortised O(1)
+            self._records = np.concatenate([self._records, np.zeros_like(self._records)])
+        record = self._records[self._length]
+        record["key"] = ord(key)
+        record["press_ns"] = timestamp_ns
+        record["release_ns"] = 0
+        self._length += 1
+
+    def release(self, key, timestamp_ns=None):
+        """Attach a release time to the most recent unreleased press of key"""
+        if timestamp_ns is None:
+            timestamp_ns = time.perf_counter_ns()
+        code = ord(key)
+        for i in range(self._length - 1, -1, -1):
+            record = self._records[i]
+            if record["key"] == code and record["release_ns"] == 0:
+                record["release_ns"] = timestamp_ns
+                return True
+        return False
+
+    def undo(self):
+        """Drop the last keystroke, as for backspace (O(1))"""
+        if self._length:
+            self._length -= 1
+
+    def clear(self):
+        self._length = 0
+
+    def records(self):
+        """Zero-copy view of the recorded keystrokes"""
+        return self._records[:self._length]
+
+    @property
+    def text(self):
+        return "".join(map(chr, self._records["key"][:self._length]))
+
+    def intervals(self):
+        """Press-to-press intervals in seconds, the features the model is trained on"""
+        return np.diff(self._records["press_ns"][:self._length]) / 1e9
+
+    def hold_times(self):
+        """Press-to-release durations in seconds (NaN for keys not yet released)"""
+        records = self.records()
+        holds = (records["release_ns"] - records["press_ns"]) / 1e9
+        holds[records["release_ns"] == 0] = np.nan
+        return holds
+
+
+class InputCapture:
+    """Timestamps key events on the keyboard hook's own thread, away from the Tk loop
+
+    The hook callback only stamps the event and puts it on a SimpleQueue (a
+    lock-free handoff in CPython), so a keypress arriving while the UI thread is
+    busy redrawing keeps its true arrival time. The UI thread still handles the
+    Tk key event and asks for the matching capture-time timestamp.
+    """
+
+    def __init__(self):
+        self.events = queue.SimpleQueue()
+        self._pending = deque(maxlen=CAPACITY)
+        self._hook = None
+        self.paused = False  # Drop events, e.g. between enrollment attempts
+        self.notify = None  # Called on the hook thread after each queued event
+
+    @classmethod
+    def start(cls):
+        """Install the global keyboard hook; returns None when no backend is available"""
+        try:
+            import keyboard
+        except ImportError:
+            return None
+        capture = cls()
+        try:
+            capture._hook = keyboard.hook(capture.on_event)
+        except Exception:
+            # keyboard needs elevated rights on some platforms; fall back to Tk timing
+            return None
+        return capture
+
+    def stop(self):
+        if self._hook is not None:
+            import keyboard
+            keyboard.unhook(self._hook)
+            self._hook = None
+
+    def on_event(self, event):
+        """Hook-thread callback: stamp first, then hand over"""
+        timestamp_ns = time.perf_counter_ns()
+        if self.paused:
+            return
+        name = " " if event.name == "space" else event.name
+        self.events.put((event.event_type, name, timestamp_ns))
+        notify = self.notify
+        if notify is not None:
+            notify()
+
+    def drain(self):
+        """All queued (event type, name, timestamp_ns) events, oldest first"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def discard(self):
+        """Forget every queued event, e.g. keys typed before this attempt or outside password entry"""
+        self.drain()
+        self._pending.clear()
+
+    def _take(self, event_type, char, fallback_ns):
+        while True:
+            try:
+                self._pending.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        for i, (kind, name, timestamp_ns) in enumerate(self._pending):
+            if kind == event_type and name is not None and name.lower() == char.lower():
+                # Events before the match were never delivered to Tk (e.g. modifiers)
+                for _ in range(i + 1):
+                    self._pending.popleft()
+                return timestamp_ns
+        return fallback_ns
+
+    def press_time(self, char, fallback_ns):
+        """Capture-time timestamp of the press Tk is now handling"""
+        return self._take("down", char, fallback_ns)
+
+    def release_time(self, char, fallback_ns):
+        return self._take("up", char, fallback_ns)
+
+
+def jitter_benchmark(n_keys=200, interval_ms=120, load=True):
+    """Interval error of handler-time vs capture-time stamps while Matrix Rain renders
+
+    A typist thread fires synthetic keys at exact times. It stamps each one as the
+    capture thread would, then posts it to the Tk loop, where the handler stamps
+    it again. Needs a display (e.g. xvfb-run).
+    """
+    import tkinter as tk
+    from matrix_rain import MatrixRain, FRAME_MS
+
+    root = tk.Tk()
+    width, height = root.winfo_screenwidth(), root.winfo_screenheight()
+    canvas = tk.Canvas(root, width=width, height=height, bg='black', highlightthickness=0)
+    canvas.pack()
+    true_ns, capture_ns, handler_ns = [], [], []
+    root.bind('<<SyntheticKey>>', lambda e: handler_ns.append(time.perf_counter_ns()))
+
+    if load:
+        rain = MatrixRain(canvas, width, height)
+
+        def animate():
+            rain.step()
+            root.after(FRAME_MS, animate)
+        animate()
+
+    def typist():
+        rng = np.random.default_rng(0)
+        next_ns = time.perf_counter_ns() + 500_000_000
+        for _ in range(n_keys):
+            while time.perf_counter_ns() < next_ns:
+                time.sleep(0.0005)
+            true_ns.append(next_ns)
+            capture_ns.append(time.perf_counter_ns())
+            root.event_generate('<<SyntheticKey>>', when='tail')
+            next_ns += int(rng.normal(interval_ms, interval_ms / 4) * 1_000_000)
+        root.after(500, root.quit)
+
+    threading.Thread(target=typist, daemon=True).start()
+    root.mainloop()
+    root.destroy()
+
+    true_intervals = np.diff(true_ns) / 1e6
+    results = {}
+    for name, stamps in (("handler", handler_ns), ("capture", capture_ns)):
+        errors = np.abs(np.diff(stamps[:len(true_ns)]) / 1e6 - true_intervals[:len(stamps) - 1])
+        results[name] = errors
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keystroke timestamp jitter benchmark (needs a display)")
+    parser.add_argument("--keys", type=int, default=200)
+    parser.add_argument("--interval-ms", type=float, default=120)
+    parser.add_argument("--no-load", action="store_true", help="Run without the Matrix Rain animation")
+    args = parser.parse_args()
+
+    for name, errors in jitter_benchmark(args.keys, args.interval_ms, not args.no_load).items():
+        p50, p99 = np.percentile(errors, [50, 99])
+        print(f"{name:<8} interval error: mean {errors.mean():6.2f} ms  p50 {p50:6.2f} ms  "
+              f"p99 {p99:6.2f} ms  max {errors.max():6.2f} ms")
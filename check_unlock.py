@@ -6,6 +6,7 @@ import win32event
 import ctypes
 from ctypes import wintypes
 import sys
+from lockscreen_service import send_command
 
 # Constants
 EVENT_SYSTEM_DESKTOPSWITCH = 0x0020
@@ -26,6 +27,16 @@ def run_lockscreen():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     lockscreen_path = os.path.join(script_dir, "lockscreen.py")
 
+    # A resident lockscreen service shows instantly; only spawn a fresh process without one
+    try:
+        response = send_command("lock")
+        if "error" not in response:
+            print("Lock command sent to the lockscreen service.")
+            return
+        print(f"Lockscreen service: {response['error']}")
+    except (OSError, ValueError):
+        pass
+
     try:
         print("Launching lockscreen.py...")
         # Launch lockscreen.py without a visible window
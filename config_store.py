@@ -0,0 +1,101 @@
+"""Settings shared by the settings app, the lockscreen and the verification daemon.
+
+Everything lives in one JSON file that is only ever replaced whole (temp file
++ os.replace), so readers never see a half-written version. Readers keep the
+parsed settings and re-stat the file before use; it is parsed again only
+when its inode, mtime or size changed, so checking costs one stat.
+"""
+import json
+import os
+import threading
+
+# Defaults
+CONFIG_FILE = "keystroke_config.json"
+DEFAULTS = {
+    "password": "sumanth",
+    "threshold": 0.10,  # Fallback for templates trained without a calibrated threshold
+    "security_questions": {
+        "gjkkj": "sum",
+        "hghjhkj": "suman",
+        "jhgbj": "sumanth",
+    },
+    "matrix_character": "1",  # Double-clicking it in the paused rain opens the security questions
+    "template_dir": "templates",  # Where the template manifest (index.json) and templates live
+    "scorer": "euclidean",  # Matcher recorded in new templates; see scorers.py for the alternatives
+    "target_far": None,  # None calibrates at the EER; e.g. 0.01 picks the loosest threshold with FAR <= 1%
+    "online_update": False,  # Adapt the template to each successful unlock (opt-in)
+}
+
+
+def file_signature(path):
+    """(inode, mtime, size) of a file, or None if it doesn't exist; changes whenever the file is replaced"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class ConfigStore:
+    """One JSON settings file with atomic writes and change-checked reads"""
+
+    def __init__(self, path=CONFIG_FILE, defaults=DEFAULTS):
+        self.path = path
+        self.defaults = defaults
+        self._settings = None
+        self._signature = None
+        self._lock = threading.Lock()
+        self.version = 0  # Bumped each time the file is (re)parsed
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def load(self):
+        """Current settings (defaults overlaid with the file); reparses only if the file changed"""
+        signature = file_signature(self.path)
+        if self._settings is not None and signature == self._signature:
+            return self._settings
+        with self._lock:
+            if self._settings is None or signature != self._signature:
+                # Stat before reading: a write racing with us just means one more reparse later
+                self._settings = {**self.defaults, **self._read()}
+                self._signature = signature
+                self.version += 1
+            return self._settings
+
+    def get(self, key):
+        return self.load()[key]
+
+    def update(self, **changes):
+        """Merge changes into the file and replace it atomically"""
+        unknown = set(changes) - set(self.defaults)
+        if unknown:
+            raise ValueError(f"Unknown setting(s): {', '.join(sorted(unknown))}")
+        with self._lock:
+            settings = {**self.defaults, **self._read(), **changes}
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as file:
+                json.dump(settings, file, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._settings = settings
+            self._signature = file_signature(self.path)
+            self.version += 1
+        return settings
+
+
+_default_config = None
+
+
+def get_config():
+    """Process-wide store for the default config file"""
+    global _default_config
+    if _default_config is None:
+        _default_config = ConfigStore()
+    return _default_config
@@ -0,0 +1,260 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from calibration import equal_error_rate, error_rates, histogram_equal_error_rate, score_histogram
+from scorers import DEFAULT_SCORER, SCORERS
+from train_auth import THRESHOLD, build_model
+from verify_core import verify
+from workload import MANIFEST, is_workload, read_shards
+
+# Defaults follow the Killourhy & Maxion protocol for the CMU DSL-StrongPassword data
+TRAIN_REPS = 200  # Leading attempts of each subject used for enrollment
+IMPOSTOR_REPS = 5  # Leading attempts of each subject reused as impostor attempts
+CHUNK_ROWS = 10000  # CSV rows held in memory at once
+SCORE_CHUNK = 65536  # Attempts scored per verify call inside a worker
+SCORE_BINS = 10000  # Pooled scores are kept as counts on this grid over [0, 1], never as raw arrays
+TASKS_PER_WORKER = 4  # Subjects are handed out in this many batches per worker
+META_COLUMNS = ("subject", "sessionIndex", "rep")
+
+
+def feature_columns(header):
+    """Column indices holding inter-key intervals
+
+    The CMU layout stores press-to-press intervals as DD.* columns, which is the
+    feature train_auth records. Our own session exports have a subject column
+    followed by interval columns.
+    """
+    dd = [i for i, name in enumerate(header) if name.startswith("DD.")]
+    if dd:
+        return dd
+    return [i for i, name in enumerate(header) if name not in META_COLUMNS]
+
+
+def spill_dataset(csv_path, workdir, chunk_rows=CHUNK_ROWS, impostor_reps=IMPOSTOR_REPS):
+    """Stream the CSV into one raw float64 file per subject
+
+    Returns (subjects, n_features, impostor pool, impostor owner ids); only
+    one chunk of rows plus the small impostor pool is ever held in memory.
+    """
+    subjects = {}
+    pool, owners = [], []
+    with open(csv_path, newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        subject_col = header.index("subject")
+        columns = feature_columns(header)
+
+        def flush(rows):
+            grouped = {}
+            for row in rows:
+                grouped.setdefault(row[subject_col], []).append([float(row[i]) for i in columns])
+            for subject, values in grouped.items():
+                values = np.asarray(values, dtype=np.float64)
+                if subject not in subjects:
+                    subjects[subject] = {"path": os.path.join(workdir, f"subject_{len(subjects)}.f64"), "count": 0}
+                entry = subjects[subject]
+                # Remember each subject's first attempts as impostor material for everyone else
+                take = max(0, impostor_reps - entry["count"])
+                if take:
+                    pool.extend(values[:take])
+                    owners.extend([subject] * min(take, len(values)))
+                with open(entry["path"], "ab") as out:
+                    values.tofile(out)
+                entry["count"] += len(values)
+
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if len(rows) >= chunk_rows:
+                flush(rows)
+                rows = []
+        if rows:
+            flush(rows)
+
+    return subjects, len(columns), np.asarray(pool, dtype=np.float64), np.asarray(owners)
+
+
+def spill_workload(workload_dir, workdir, impostor_reps=IMPOSTOR_REPS):
+    """spill_dataset for .npy shards from workload.py: each user's genuine attempts form a subject"""
+    subjects = {}
+    pool, owners = [], []
+    n_features = 0
+    for features, labels in read_shards(workload_dir):
+        n_features = features.shape[1]
+        genuine = np.flatnonzero(labels[:, 0] == labels[:, 1])
+        # Stable sort keeps each user's attempts in session order
+        order = genuine[np.argsort(labels[genuine, 0], kind="stable")]
+        users, starts = np.unique(labels[order, 0], return_index=True)
+        for user, rows in zip(users.tolist(), np.split(order, starts[1:])):
+            subject = str(user)
+            values = np.asarray(features[rows], dtype=np.float64)
+            if subject not in subjects:
+                subjects[subject] = {"path": os.path.join(workdir, f"subject_{len(subjects)}.f64"), "count": 0}
+            entry = subjects[subject]
+            take = max(0, impostor_reps - entry["count"])
+            if take:
+                pool.extend(values[:take])
+                owners.extend([subject] * min(take, len(values)))
+            with open(entry["path"], "ab") as out:
+                values.tofile(out)
+            entry["count"] += len(values)
+    return subjects, n_features, np.asarray(pool, dtype=np.float64), np.asarray(owners)
+
+
+def score_in_chunks(features, model, threshold):
+    return np.concatenate([verify(features[start:start + SCORE_CHUNK], model, threshold)[0]
+                           for start in range(0, len(features), SCORE_CHUNK)] or [np.empty(0)])
+
+
+def evaluate_subject(subject, path, count, n_features, pool, owners, train_reps, threshold, scorer):
+    """Enroll one subject and score its genuine attempts and everyone else's impostor attempts"""
+    attempts = np.memmap(path, dtype=np.float64, mode="r", shape=(count, n_features))
+    model = build_model(np.asarray(attempts[:train_reps]), scorer)
+
+    genuine = score_in_chunks(attempts[train_reps:], model, threshold)
+    impostor = score_in_chunks(pool[owners != subject], model, threshold)
+
+    far, frr = error_rates(genuine, impostor, threshold)
+    eer, eer_threshold = equal_error_rate(genuine, impostor)
+    calibrated = model.get("threshold", threshold)
+    calibrated_far, calibrated_frr = error_rates(genuine, impostor, calibrated)
+    result = {
+        "subject": subject,
+        "calibrated_threshold": calibrated,
+        "calibrated_far": calibrated_far,
+        "calibrated_frr": calibrated_frr,
+        "far": far,
+        "frr": frr,
+        "eer": eer,
+        "eer_threshold": eer_threshold,
+    }
+    return result, genuine, impostor
+
+
+def evaluate_subjects(task):
+    """Evaluate a batch of subjects, reducing their scores to pooled counts before returning
+
+    Raw impostor scores grow with subjects x pool size, so only per-subject
+    metrics and fixed-size histograms ever leave the worker.
+    """
+    subjects, n_features, pool_path, owners_path, train_reps, threshold, scorer = task
+    pool = np.load(pool_path, mmap_mode="r")
+    owners = np.load(owners_path)
+    results = []
+    pooled = {"genuine_counts": np.zeros(SCORE_BINS, dtype=np.int64), "impostor_counts": np.zeros(SCORE_BINS, dtype=np.int64),
+              "false_accepts": 0, "false_rejects": 0}
+    for subject, path, count in subjects:
+        result, genuine, impostor = evaluate_subject(subject, path, count, n_features, pool, owners, train_reps, threshold, scorer)
+        results.append(result)
+        pooled["genuine_counts"] += score_histogram(genuine, SCORE_BINS)
+        pooled["impostor_counts"] += score_histogram(impostor, SCORE_BINS)
+        pooled["false_accepts"] += int(np.count_nonzero(impostor >= threshold))
+        pooled["false_rejects"] += int(np.count_nonzero(genuine < threshold))
+    return results, pooled
+
+
+def default_train_reps(path):
+    """TRAIN_REPS, or half of each user's genuine attempts for a smaller workload.py output"""
+    if not is_workload(path):
+        return TRAIN_REPS
+    with open(os.path.join(path, MANIFEST)) as file:
+        genuine = json.load(file)["options"].get("genuine", TRAIN_REPS * 2)
+    return min(TRAIN_REPS, genuine // 2)
+
+
+def evaluate(csv_path, threshold=THRESHOLD, train_reps=None, impostor_reps=IMPOSTOR_REPS,
+             chunk_rows=CHUNK_ROWS, workers=None, scorer=DEFAULT_SCORER):
+    """Run the full evaluation; returns (per-subject results, overall summary)"""
+    if train_reps is None:
+        train_reps = default_train_reps(csv_path)
+    with tempfile.TemporaryDirectory(prefix="keystroke_eval_") as workdir:
+        if is_workload(csv_path):
+            subjects, n_features, pool, owners = spill_workload(csv_path, workdir, impostor_reps)
+        else:
+            subjects, n_features, pool, owners = spill_dataset(csv_path, workdir, chunk_rows, impostor_reps)
+        pool_path = os.path.join(workdir, "impostor_pool.npy")
+        owners_path = os.path.join(workdir, "impostor_owners.npy")
+        np.save(pool_path, pool)
+        np.save(owners_path, owners)
+
+        enrolled = [(subject, entry["path"], entry["count"]) for subject, entry in subjects.items() if entry["count"] > train_reps]
+        batch = max(1, -(-len(enrolled) // ((workers or os.cpu_count() or 1) * TASKS_PER_WORKER)))
+        tasks = [(enrolled[start:start + batch], n_features, pool_path, owners_path, train_reps, threshold, scorer)
+                 for start in range(0, len(enrolled), batch)]
+        results = []
+        genuine_counts = np.zeros(SCORE_BINS, dtype=np.int64)
+        impostor_counts = np.zeros(SCORE_BINS, dtype=np.int64)
+        false_accepts = false_rejects = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for batch_results, pooled in executor.map(evaluate_subjects, tasks):
+                results.extend(batch_results)
+                genuine_counts += pooled["genuine_counts"]
+                impostor_counts += pooled["impostor_counts"]
+                false_accepts += pooled["false_accepts"]
+                false_rejects += pooled["false_rejects"]
+
+    n_genuine, n_impostor = int(genuine_counts.sum()), int(impostor_counts.sum())
+    far = false_accepts / n_impostor if n_impostor else 0.0
+    frr = false_rejects / n_genuine if n_genuine else 0.0
+    eer, eer_threshold = histogram_equal_error_rate(genuine_counts, impostor_counts)
+    summary = {
+        "scorer": scorer,
+        "subjects": len(results),
+        "genuine_attempts": n_genuine,
+        "impostor_attempts": n_impostor,
+        "threshold": threshold,
+        "train_reps": train_reps,
+        "far": far,
+        "frr": frr,
+        "eer": eer,
+        "eer_threshold": eer_threshold,
+        "mean_subject_eer": float(np.nanmean([r["eer"] for r in results])) if results else float("nan"),
+        "calibrated_far": float(np.mean([r["calibrated_far"] for r in results])) if results else float("nan"),
+        "calibrated_frr": float(np.mean([r["calibrated_frr"] for r in results])) if results else float("nan"),
+    }
+    return results, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline FAR/FRR/EER evaluation over a keystroke dataset")
+    parser.add_argument("dataset", help="CSV in the CMU DSL-StrongPassword layout, a subject,interval... export "
+                                        "or a workload.py output directory")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--train-reps", type=int, default=None,
+                        help=f"Enrollment attempts per subject (default {TRAIN_REPS}, or half of a workload's genuine attempts)")
+    parser.add_argument("--impostor-reps", type=int, default=IMPOSTOR_REPS)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--scorer", choices=sorted(SCORERS), default=DEFAULT_SCORER)
+    parser.add_argument("--json", help="Also write per-subject and overall results to this file")
+    args = parser.parse_args()
+
+    results, summary = evaluate(args.dataset, args.threshold, args.train_reps, args.impostor_reps,
+                                args.chunk_rows, args.workers, args.scorer)
+    if not results:
+        print(f"❌ No subject has more than {summary['train_reps']} attempts to enroll on; lower --train-reps")
+        sys.exit(1)
+
+    print(f"{'subject':<12}{'FAR':>8}{'FRR':>8}{'EER':>8}{'EER thr':>9}")
+    for r in sorted(results, key=lambda r: r["subject"]):
+        print(f"{r['subject']:<12}{r['far']:>8.3f}{r['frr']:>8.3f}{r['eer']:>8.3f}{r['eer_threshold']:>9.3f}")
+    print(f"\nOverall at threshold {summary['threshold']:.3f}: FAR {summary['far']:.3f}, FRR {summary['frr']:.3f}")
+    print(f"Pooled EER {summary['eer']:.3f} (threshold {summary['eer_threshold']:.3f}), "
+          f"mean per-subject EER {summary['mean_subject_eer']:.3f}")
+    print(f"Per-user calibrated thresholds: mean FAR {summary['calibrated_far']:.3f}, "
+          f"mean FRR {summary['calibrated_frr']:.3f}")
+    print(f"{summary['subjects']} subjects, {summary['genuine_attempts']} genuine and "
+          f"{summary['impostor_attempts']} impostor attempts")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"summary": summary, "subjects": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
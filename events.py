@@ -0,0 +1,130 @@
+import json
+import os
+import socket
+import time
+import uuid
+
+# Subscribers register one endpoint file each in this directory
+EVENTS_DIR = "lockscreen_events"
+MAX_DATAGRAM = 65507
+
+# Event types
+AUTH_FAILED = "auth_failed"
+AUTH_SUCCESS = "auth_success"
+UNLOCKED = "unlocked"
+
+HAS_UNIX_DGRAM = hasattr(socket, "AF_UNIX") and os.name != "nt"
+
+
+class EventPublisher:
+    """Pushes structured authentication events to every registered subscriber
+
+    Each event is one JSON datagram, sent to a Unix datagram socket per
+    subscriber (UDP on localhost where AF_UNIX datagrams are unavailable).
+    Publishing never blocks: with no subscribers it costs one stat.
+    """
+
+    def __init__(self, directory=EVENTS_DIR):
+        self.directory = directory
+        self._endpoints = []
+        self._dir_mtime = None
+        family = socket.AF_UNIX if HAS_UNIX_DGRAM else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            self._endpoints, self._dir_mtime = [], None
+            return
+        if mtime == self._dir_mtime:
+            return
+        self._dir_mtime = mtime
+        endpoints = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".sock") and HAS_UNIX_DGRAM:
+                endpoints.append((path, path))
+            elif name.endswith(".port") and not HAS_UNIX_DGRAM:
+                try:
+                    with open(path) as file:
+                        endpoints.append((path, ("127.0.0.1", int(file.read()))))
+                except (OSError, ValueError):
+                    continue
+        self._endpoints = endpoints
+
+    def publish(self, event_type, user=None, score=None, **fields):
+        event = {"type": event_type, "user": user, "score": score, "timestamp": time.time(), **fields}
+        payload = json.dumps(event).encode()
+        self._refresh()
+        for path, address in list(self._endpoints):
+            try:
+                self.sock.sendto(payload, address)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Subscriber exited without unregistering
+                self._endpoints.remove((path, address))
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            except (BlockingIOError, OSError):
+                pass  # A full or broken subscriber queue must never stall the lockscreen
+        return event
+
+    def close(self):
+        self.sock.close()
+
+
+class EventSubscriber:
+    """Receives events pushed by EventPublisher"""
+
+    def __init__(self, directory=EVENTS_DIR):
+        os.makedirs(directory, exist_ok=True)
+        name = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        if HAS_UNIX_DGRAM:
+            self.path = os.path.join(directory, name + ".sock")
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.sock.bind(self.path)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind(("127.0.0.1", 0))
+            self.path = os.path.join(directory, name + ".port")
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as file:
+                file.write(str(self.sock.getsockname()[1]))
+            os.replace(tmp_path, self.path)
+
+    def receive(self, timeout=None):
+        """Next event as a dict, or None on timeout"""
+        self.sock.settimeout(timeout)
+        try:
+            payload = self.sock.recv(MAX_DATAGRAM)
+        except socket.timeout:
+            return None
+        return json.loads(payload)
+
+    def __iter__(self):
+        while True:
+            yield self.receive()
+
+    def close(self):
+        self.sock.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    print(f"👂 Listening for lockscreen events in {EVENTS_DIR}/ ...")
+    with EventSubscriber() as subscriber:
+        for event in subscriber:
+            latency_ms = (time.time() - event["timestamp"]) * 1000
+            print(f"{event} ({latency_ms:.2f} ms)")
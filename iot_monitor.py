@@ -1,94 +1,80 @@
-import time
-import requests
 import os
+import sys
+from events import EventSubscriber, AUTH_FAILED, AUTH_SUCCESS, UNLOCKED
+from log_tailer import LogTailer
+from blynk_client import BlynkNotifier
 
 BLYNK_AUTH = "v9Ii7AZN7tIMLLHdVjZCNaosGbUk99Eb"
-BLYNK_URL = "https://blynk.cloud/external/api/update"
+BLYNK_SERVER = os.environ.get("BLYNK_SERVER", "https://blynk.cloud")  # Override to test against a stand-in
 LOG_FILE = "lockscreen_log.txt"
 
-last_handled_log = ""
 failed_attempts = 0
 
-def read_last_log_entry():
-    try:
-        # Wait until file exists before reading
-        while not os.path.exists(LOG_FILE):
-            time.sleep(0.5)
-            
-        with open(LOG_FILE, "r") as file:
-            lines = file.readlines()
-            if lines:
-                return lines[-1].strip()
-    except Exception as e:
-        print(f"⚠️ Error reading log file: {e}")
-    return ""
+notifier = BlynkNotifier(BLYNK_AUTH, server=BLYNK_SERVER)
 
 def send_blynk_update(pin, value):
-    try:
-        requests.get(f"{BLYNK_URL}?token={BLYNK_AUTH}&{pin}={value}", timeout=5)
-    except Exception as e:
-        print(f"⚠️ Blynk error: {e}")
+    notifier.update({pin: value})
 
 def reset_leds_after_success():
     print("✅ System unlocked! Turning off Red LED & Blinking Green LED once...")
-    send_blynk_update("V1", 0)
-    send_blynk_update("V3", 0)
-    send_blynk_update("V2", 1)
-    time.sleep(2)
-    send_blynk_update("V2", 0)
-    print("✅ Green LED blinked once successfully!")
+    notifier.update({"V1": 0, "V3": 0, "V2": 1})
+    notifier.schedule(2, {"V2": 0})
+    print("✅ Green LED blink scheduled!")
 
 def reset_after_success():
     global failed_attempts
     failed_attempts = 0
     reset_leds_after_success()
 
+def record_failure():
+    global failed_attempts
+    failed_attempts += 1
+
+    if failed_attempts >= 3:
+        send_blynk_update("V1", 1)
+    if failed_attempts >= 5:
+        send_blynk_update("V3", 1)
+        notifier.schedule(1, {"V3": 0})
+
+def monitor_events():
+    """React to events pushed by the lockscreen as they happen"""
+    print("🔍 Subscribed to lockscreen events...")
+    with EventSubscriber() as subscriber:
+        for event in subscriber:
+            print(f"📡 Event: {event['type']} (user {event['user']}, score {event['score']})")
+
+            if event["type"] == AUTH_FAILED:
+                record_failure()
+            elif event["type"] == UNLOCKED:
+                # Published for both password and security-question unlocks
+                reset_after_success()
+            elif event["type"] == AUTH_SUCCESS:
+                print("🎉 Success event received!")
+
 def monitor_log():
-    global last_handled_log, failed_attempts
+    """Fallback: follow the audit log for lockscreens that don't publish events"""
     print(f"🔍 Monitoring {LOG_FILE}...")
 
-    # Wait for log file to exist before opening
-    while not os.path.exists(LOG_FILE):
+    if not os.path.exists(LOG_FILE):
         print("⌛ Waiting for log file to be created...")
-        time.sleep(1)
-
-    with open(LOG_FILE, "r") as file:
-        file.seek(0, 2)
-
-        while True:
-            line = file.readline()
-            if not line:
-                time.sleep(0.5)
-                
-                # Handle empty file scenario
-                try:
-                    if os.stat(LOG_FILE).st_size == 0:
-                        continue
-                except FileNotFoundError:
-                    continue
-
-                last_entry = read_last_log_entry()
-                if last_entry and "System unlocked successfully" in last_entry and last_entry != last_handled_log:
-                    reset_after_success()
-                    last_handled_log = last_entry
-                continue
-
-            print(f"📜 Log: {line.strip()}")
-
-            if "Failed authentication attempt" in line:
-                failed_attempts += 1
-
-                if failed_attempts >= 3:
-                    send_blynk_update("V1", 1)
-                if failed_attempts >= 5:
-                    send_blynk_update("V3", 1)
-                    time.sleep(1)
-                    send_blynk_update("V3", 0)
-
-            elif "Successful authentication" in line:
-                print("🎉 Success detected in log!")
-                reset_after_success()
-                last_handled_log = line.strip()
+
+    # Only lines written from now on matter; the tailer waits for the file if needed
+    tailer = LogTailer(LOG_FILE)
+    for line in tailer.follow():
+        print(f"📜 Log: {line.strip()}")
+
+        if "Failed authentication attempt" in line:
+            record_failure()
+
+        elif "System unlocked successfully" in line:
+            # Logged for both password and security-question unlocks
+            reset_after_success()
+
+        elif "Successful authentication" in line:
+            print("🎉 Success detected in log!")
 
 if __name__ == "__main__":
-    monitor_log()
\ No newline at end of file
+    if "--log" in sys.argv:
+        monitor_log()
+    else:
+        monitor_events()
\ No newline at end of file
@@ -2,33 +2,43 @@ import sys
 import tkinter as tk
 from tkinter import ttk
 import time
-import numpy as np
-from sklearn.preprocessing import StandardScaler
-import pickle
 from datetime import datetime
 import logging
 import os
 import ctypes
 import win32con
 import win32gui
-import random
-
-# Import password and threshold from train_auth.py
-from train_auth import PASSWORD, THRESHOLD
+from verify_core import verify
+from capture import KeystrokeBuffer, InputCapture
+from matrix_rain import MatrixRain, FRAME_MS
+from template import MODEL_FILE, LEGACY_MODEL_FILE, TemplateFormatError
+from template_store import DEFAULT_USER, get_store
+from audit_log import setup_audit_log
+from metrics import span, observe, configure_from_env
+from events import EventPublisher, AUTH_FAILED, AUTH_SUCCESS, UNLOCKED
+from config_store import get_config
 
 # Lock file path
 LOCK_FILE_PATH = "lockscreen.lock"
 
-# Set up logging
-logging.basicConfig(
-    filename='lockscreen_log.txt',
-    level=logging.INFO,
-    format='%(asctime)s - %(message)s'
-)
+# Set up logging: records are queued here and written by a background thread
+audit_log = setup_audit_log('lockscreen_log.txt')
+
+# Latency histograms, exported only when KEYSTROKE_METRICS is set
+configure_from_env()
 
 class KeystrokeLockscreen:
-    def __init__(self, root):
+    def __init__(self, root, user_id=DEFAULT_USER, resident=False):
+        started = time.perf_counter()
         self.root = root
+        self.user_id = user_id
+        # A resident lockscreen hides after unlocking and is shown again by lockscreen_service
+        self.resident = resident
+        self.on_unlock = None
+        self.on_hide = None
+        self.on_shown = None  # Called by show() when the window was still mapped, as <Map> won't fire
+        self.unlock_timer = None
+        self.events = EventPublisher()
         self.root.title("Security Lockscreen")
 
         # Make it fullscreen and always on top
@@ -49,26 +59,28 @@ class KeystrokeLockscreen:
         self.canvas.pack(fill='both', expand=True)
 
         # Initialize Matrix Rain effect parameters
-        self.matrix_rain_drops = []
         self.matrix_rain_running = True
-        self.init_matrix_rain_effect()
-        
-        # Security questions and answers
-        self.security_questions = {
-    "gjkkj": "sum",
-    "hghjhkj": "suman",
-    "jhgbj": "sumanth",
-}
+        with span("startup_matrix_rain"):
+            self.init_matrix_rain_effect()
+        
+        # Password, fallback threshold, security questions and matrix character, from the config file
+        self.config = get_config()
+        self.config_version = None
+        self.model = None
+        self.apply_config()
         self.current_question_index = 0
         self.security_mode = False
         
         # Create GUI elements
-        self.setup_gui()
+        with span("startup_gui"):
+            self.setup_gui()
         
         # Initialize authentication variables
-        self.current_input = ""
-        self.keystroke_times = []
-        self.last_keystroke_time = None
+        self.keystrokes = KeystrokeBuffer()
+        self.return_time = None
+        # Timestamps from the keyboard hook thread, so redraws can't delay them
+        with span("startup_capture"):
+            self.capture = InputCapture.start()
         
         # Load the trained model
         if not self.load_model():
@@ -76,12 +88,15 @@ class KeystrokeLockscreen:
         
         # Start time update
         self.update_time()
+        observe("startup_total", time.perf_counter() - started)
+
+        if resident:
+            self.hide()
 
     def hide_taskbar(self):
         """Hide Windows taskbar"""
         hwnd = win32gui.FindWindow("Shell_traywnd", None)
         win32gui.ShowWindow(hwnd, 0)
-        self.root.bind('<Key>', lambda e: self.prevent_start_menu(e))
         
     def show_taskbar(self):
         """Show Windows taskbar (called when unlocking)"""
@@ -226,20 +241,57 @@ class KeystrokeLockscreen:
         self.root.bind('<Control-Alt-Delete>', lambda e: 'break')
         self.root.bind('<Shift-Escape>', lambda e: 'break')
         self.root.bind('<Key>', self.on_key_press)
+        self.root.bind('<KeyRelease>', self.on_key_release)
         
     def load_model(self):
         """Load the trained keystroke model"""
         try:
-            with open("typing_model.pkl", "rb") as model_file:
-                self.model = pickle.load(model_file)
-            self.PASSWORD = PASSWORD
-            self.THRESHOLD = THRESHOLD
+            with span("model_load"):
+                self.model = get_store().get(self.user_id)
+            self.set_updater()
+            # Per-user calibrated threshold, falling back to the global one for older models
+            self.THRESHOLD = self.model.get("threshold", self.config.get("threshold"))
             logging.info("Model loaded successfully")
             return True
-        except FileNotFoundError:
-            logging.error("No trained model found!")
+        except KeyError:
+            legacy = [path for path in (MODEL_FILE, LEGACY_MODEL_FILE) if os.path.exists(path)]
+            if legacy:
+                logging.error(f"Found legacy {legacy[0]}; run migrate_model.py to add it to the template store")
+            else:
+                logging.error(f"No trained model found for user {self.user_id}!")
+            return False
+        except (FileNotFoundError, TemplateFormatError) as e:
+            logging.error(f"Could not load model: {e}")
             return False
             
+    def set_updater(self):
+        """Start or stop adapting the template to successful unlocks, per the config"""
+        self.updater = None
+        if self.config.get("online_update"):
+            from online_update import OnlineUpdater
+            self.updater = OnlineUpdater(self.user_id)
+
+    def apply_config(self):
+        """Take over settings changed in the config file since the last call; True if any did"""
+        settings = self.config.load()
+        if self.config.version == self.config_version:
+            return False
+        self.config_version = self.config.version
+        self.PASSWORD = settings["password"]
+        self.security_questions = settings["security_questions"]
+        self.matrix_character = settings["matrix_character"]
+        if self.model is not None:
+            self.THRESHOLD = self.model.get("threshold", settings["threshold"])
+            if (self.updater is not None) != bool(settings["online_update"]):
+                self.set_updater()
+        return True
+
+    def refresh_settings(self):
+        """Between attempts: pick up new settings and a retrained template without a restart"""
+        self.apply_config()
+        if get_store().refresh(self.user_id) and not self.load_model():
+            self.show_error_and_close("Error: No trained model found! Please run training first.")
+
     def show_error_and_close(self, message):
         """Show error message and close on key press"""
         self.error_label.config(text=message)
@@ -253,9 +305,9 @@ class KeystrokeLockscreen:
         
     def reset_input(self):
         """Reset all input-related variables"""
-        self.current_input = ""
-        self.keystroke_times = []
-        self.last_keystroke_time = None
+        self.keystrokes.clear()
+        if self.capture is not None:
+            self.capture.discard()  # Keys typed before this attempt
         self.password_display.config(text="")
         
     def blink_text(self, label):
@@ -266,87 +318,150 @@ class KeystrokeLockscreen:
         
     def on_key_press(self, event):
         """Handle key press events"""
+        # Timestamp first so handler work doesn't skew the interval
+        current_time = received = time.perf_counter_ns()
+        if self.prevent_start_menu(event):
+            return 'break'
         if self.security_mode:
+            if self.capture is not None:
+                # Not matched to a Tk press here; left queued they'd be taken for the next attempt's keys
+                self.capture.discard()
             return
 
         if event.keysym == 'Return':
+            self.return_time = received
             self.verify_input()
+            self.return_time = None
+            observe("attempt_total", (time.perf_counter_ns() - received) / 1e9)
             return 'break'
         
         if event.keysym == 'BackSpace':
-            if self.current_input:
-                self.current_input = self.current_input[:-1]
-                self.keystroke_times = self.keystroke_times[:-1] if self.keystroke_times else []
-                self.password_display.config(text="*" * len(self.current_input))
+            if len(self.keystrokes):
+                self.keystrokes.undo()
+                self.password_display.config(text="*" * len(self.keystrokes))
             return 'break'
             
         if event.char and event.char.isprintable():
-            current_time = time.time()
-            
-            if self.last_keystroke_time is not None:
-                interval = current_time - self.last_keystroke_time
-                self.keystroke_times.append(interval)
-            
-            self.last_keystroke_time = current_time
-            self.current_input += event.char
-            
-            self.password_display.config(text="*" * len(self.current_input))
+            if not len(self.keystrokes):
+                # First key of an attempt: two stats unless the config or template changed
+                self.refresh_settings()
+            if self.capture is not None:
+                current_time = self.capture.press_time(event.char, current_time)
+                # How long the key took to travel from the hook thread to the Tk handler
+                observe("key_delivery", (received - current_time) / 1e9)
+            self.keystrokes.press(event.char, current_time)
+            self.password_display.config(text="*" * len(self.keystrokes))
+            observe("key_capture", (time.perf_counter_ns() - received) / 1e9)
                 
         return 'break'
         
+    def on_key_release(self, event):
+        """Record key release times alongside the presses"""
+        current_time = time.perf_counter_ns()
+        if not self.security_mode and event.char and event.char.isprintable():
+            if self.capture is not None:
+                current_time = self.capture.release_time(event.char, current_time)
+            self.keystrokes.release(event.char, current_time)
+        
     def verify_input(self):
         """Verify the password and typing pattern"""
-        if len(self.current_input) != len(self.PASSWORD) or len(self.keystroke_times) != len(self.PASSWORD) - 1:
-            self.handle_failed_attempt("Incorrect password or typing pattern (Score: 0.00) doesn't match!")
+        with span("feature_build"):
+            typed = self.keystrokes.text
+            intervals = self.keystrokes.intervals()
+        if len(typed) != len(self.PASSWORD) or len(intervals) != len(self.PASSWORD) - 1:
+            self.handle_failed_attempt("Incorrect password or typing pattern (Score: 0.00) doesn't match!", 0.0)
             self.reset_input()
             return
             
-        if self.current_input != self.PASSWORD:
-            self.handle_failed_attempt("Incorrect password or typing pattern (Score: 0.00) doesn't match!")
+        if typed != self.PASSWORD:
+            self.handle_failed_attempt("Incorrect password or typing pattern (Score: 0.00) doesn't match!", 0.0)
             self.reset_input()
             return
                 
         # Verify typing pattern
-        test_features = np.array([self.keystroke_times])
-        test_features_scaled = self.model["scaler"].transform(test_features)
-        
-        # Calculate similarity
-        distances = [np.linalg.norm(test_features_scaled - train_sample) 
-                    for train_sample in self.model["train_data"]]
-        similarity = 1 / (1 + np.mean(distances))
-        
-        if similarity >= self.THRESHOLD:
+        similarities, accepted = verify([intervals], self.model, self.THRESHOLD)
+        similarity = similarities[0]
+        
+        if accepted[0]:
+            self.events.publish(AUTH_SUCCESS, self.user_id, float(similarity))
+            if self.updater is not None:
+                try:
+                    self.updater.accept(intervals)
+                    self.model = self.updater.model
+                except OSError as e:
+                    logging.error(f"Online template update failed: {e}")
             self.unlock_system()
             logging.info("Successful authentication")
         else:
-            self.handle_failed_attempt(f"Incorrect password or typing pattern (Score: {similarity:.2f}) doesn't match!")
+            self.handle_failed_attempt(f"Incorrect password or typing pattern (Score: {similarity:.2f}) doesn't match!", float(similarity))
             self.reset_input()
         
-    def handle_failed_attempt(self, message):
+    def handle_failed_attempt(self, message, score=None):
         """Handle failed authentication attempts"""
+        self.events.publish(AUTH_FAILED, self.user_id, score)
         self.error_label.config(text=message)
         self.blink_text(self.error_label)
         logging.warning(f"Failed authentication attempt: {message}")
         
     def unlock_system(self):
         """Unlock the system and close the lockscreen"""
-        self.instruction_label.config(text="Access Granted! Unlocking...")
-        logging.info("System unlocked successfully")
+        with span("unlock_system"):
+            self.instruction_label.config(text="Access Granted! Unlocking...")
+            if self.return_time is not None:
+                observe("keypress_to_access_granted", (time.perf_counter_ns() - self.return_time) / 1e9)
+                self.return_time = None
+            self.events.publish(UNLOCKED, self.user_id)
+            logging.info("System unlocked successfully")
+            self.show_taskbar()
+            if self.on_unlock is not None:
+                self.on_unlock()
+            self.unlock_timer = self.root.after(1000, self.hide if self.resident else self.cleanup)
+
+    def show(self):
+        """Bring a resident lockscreen back up for a new lock"""
+        if self.unlock_timer is not None:
+            # Locked again during the unlock animation: stay up
+            self.root.after_cancel(self.unlock_timer)
+            self.unlock_timer = None
+        was_mapped = self.root.winfo_ismapped()
+        self.show_password_entry()
+        # Pick up settings and a template changed while we were hidden
+        self.apply_config()
+        get_store().refresh(self.user_id)
+        # show_error_and_close may have rebound keys to closing; the password entry needs them back
+        self.root.bind('<Key>', self.on_key_press)
+        if not self.load_model():
+            self.show_error_and_close("Error: No trained model found! Please run training first.")
+        self.hide_taskbar()
+        self.root.deiconify()
+        self.root.attributes('-fullscreen', True, '-topmost', True)
+        self.root.focus_force()
+        if self.capture is None:
+            self.capture = InputCapture.start()
+        if not self.matrix_rain_running:
+            self.matrix_rain_running = True
+            self.update_matrix_rain_effect()
+        if was_mapped and self.on_shown is not None:
+            self.on_shown()
+
+    def hide(self):
+        """Withdraw a resident lockscreen, keeping everything loaded for the next lock"""
+        self.unlock_timer = None
+        self.matrix_rain_running = False
+        self.canvas.tag_unbind('matrix_char', '<Double-1>')
+        if self.capture is not None:
+            # No system-wide keyboard hook while unlocked
+            self.capture.stop()
+            self.capture = None
+        self.reset_input()
+        self.root.withdraw()
         self.show_taskbar()
-        self.root.after(1000, self.cleanup)
+        if self.on_hide is not None:
+            self.on_hide()
 
     def init_matrix_rain_effect(self):
-        """Initialize the parameters for the Matrix Rain effect"""
-        # Create more drops to cover the entire width of the screen
-        for x in range(0, self.root.winfo_screenwidth(), 10):
-            for _ in range(10):
-                drop = {
-                    'x': x,
-                    'y': random.randint(-self.root.winfo_screenheight(), 1000),
-                    'speed': random.randint(5, 15),
-                    'char': random.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
-                }
-                self.matrix_rain_drops.append(drop)
+        """Create the Matrix Rain canvas items once, covering the entire screen"""
+        self.matrix_rain = MatrixRain(self.canvas, self.root.winfo_screenwidth(), self.root.winfo_screenheight())
         self.update_matrix_rain_effect()
 
     def update_matrix_rain_effect(self):
@@ -354,16 +469,8 @@ class KeystrokeLockscreen:
         if not self.matrix_rain_running:
             return
 
-        self.canvas.delete('all')
-        for drop in self.matrix_rain_drops:
-            # Create text item with tag 'matrix_char'
-            self.canvas.create_text(drop['x'], drop['y'], text=drop['char'], fill='lime', font=('Courier', 15), tags='matrix_char')
-            drop['y'] += drop['speed']
-            if drop['y'] > self.root.winfo_screenheight():
-                drop['y'] = random.randint(-self.root.winfo_screenheight(), 0)
-                drop['char'] = random.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
-                drop['speed'] = random.randint(5, 15)
-        self.root.after(50, self.update_matrix_rain_effect)
+        self.matrix_rain.step()
+        self.root.after(FRAME_MS, self.update_matrix_rain_effect)
     
     def toggle_matrix_rain(self):
         """Toggle the Matrix Rain effect"""
@@ -380,7 +487,7 @@ class KeystrokeLockscreen:
         if not self.matrix_rain_running:
             item = self.canvas.find_closest(event.x, event.y)
             char = self.canvas.itemcget(item, 'text')
-            if char == "1": # set any one alphanumeric character
+            if char == self.matrix_character:
                 self.show_security_questions()
                 self.matrix_rain_running = True
                 self.update_matrix_rain_effect()
@@ -388,6 +495,9 @@ class KeystrokeLockscreen:
     def cleanup(self):
         """Cleanup lock file on exit"""
         self.show_taskbar()
+        if self.capture is not None:
+            self.capture.stop()
+        self.events.close()
         if os.path.exists(LOCK_FILE_PATH):
             os.remove(LOCK_FILE_PATH)
         if self.root.winfo_exists():
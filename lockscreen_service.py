@@ -0,0 +1,244 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+
+# Defaults
+HOST = "127.0.0.1"
+PORT = 8766
+TIMEOUT = 2.0
+POLL_MS = 10  # Command pickup interval when Tcl can't be called from other threads
+STAND_IN_UNLOCK_DELAY = 0.05  # Seconds the stand-in view stays "visible" before unlocking itself
+
+# Service states
+HIDDEN = "hidden"
+SHOWING = "showing"
+VISIBLE = "visible"
+UNLOCKING = "unlocking"
+
+
+class LockService:
+    """Show/hide state machine for a resident lockscreen, independent of Tk
+
+    HIDDEN -lock-> SHOWING -shown-> VISIBLE -unlocked-> UNLOCKING -hidden-> HIDDEN.
+    Lock commands while showing or visible are ignored; a lock arriving during
+    the unlock animation shows the screen again. The view only needs show();
+    it reports back through shown(), unlocked() and hidden().
+    """
+
+    def __init__(self, view=None):
+        self.view = view
+        self.state = HIDDEN
+        self.trigger_ns = None
+        self.latencies_ms = []
+        self.ignored = 0
+
+    def lock(self, trigger_ns=None):
+        if self.state in (SHOWING, VISIBLE):
+            self.ignored += 1
+            return False
+        self.state = SHOWING
+        self.trigger_ns = trigger_ns or time.perf_counter_ns()
+        self.view.show()
+        return True
+
+    def shown(self):
+        if self.state != SHOWING:
+            return
+        self.state = VISIBLE
+        latency_ms = (time.perf_counter_ns() - self.trigger_ns) / 1e6
+        self.latencies_ms.append(latency_ms)
+        logging.info(f"Lockscreen visible {latency_ms:.1f} ms after trigger")
+
+    def unlocked(self):
+        if self.state == VISIBLE:
+            self.state = UNLOCKING
+
+    def hidden(self):
+        if self.state == UNLOCKING:
+            self.state = HIDDEN
+
+    def stats(self):
+        stats = {"state": self.state, "locks": len(self.latencies_ms), "ignored": self.ignored}
+        if self.latencies_ms:
+            import numpy as np  # Only here, so check_unlock can import send_command cheaply
+            latencies = np.array(self.latencies_ms)
+            stats.update({
+                "last_ms": round(latencies[-1], 3),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+            })
+        return stats
+
+
+class StandInView:
+    """Replaces the Tk window for testing: "appears" at once and unlocks itself shortly after"""
+
+    def __init__(self, unlock_delay=STAND_IN_UNLOCK_DELAY):
+        self.service = None
+        self.unlock_delay = unlock_delay
+        self.mutex = threading.Lock()
+
+    def show(self):
+        self.service.shown()
+        threading.Timer(self.unlock_delay, self._unlock).start()
+
+    def _unlock(self):
+        with self.mutex:
+            self.service.unlocked()
+            self.service.hidden()
+
+
+def serve_commands(service, dispatch, host=HOST, port=PORT):
+    """Accept JSON-line commands on a background thread; dispatch runs callables on the UI thread"""
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {"error": "invalid JSON"}
+                else:
+                    command = request.get("cmd")
+                    if command == "lock":
+                        # The sender's perf_counter_ns: the clock is system-wide, so latency includes the IPC hop
+                        trigger_ns = request.get("ts") or time.perf_counter_ns()
+                        try:
+                            dispatch(lambda: service.lock(trigger_ns))
+                            response = {"ok": True}
+                        except RuntimeError:
+                            response = {"error": "lockscreen is still starting"}
+                    elif command == "status":
+                        response = service.stats()
+                    else:
+                        response = {"error": f"unknown command {command!r}"}
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+
+    class Server(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        # Restart without waiting out TIME_WAIT; on Windows the same flag would let a second service share the port
+        allow_reuse_address = os.name != "nt"
+
+    server = Server((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def send_command(command, host=HOST, port=PORT, timeout=TIMEOUT):
+    """Send one command to a running service; raises OSError if none is listening"""
+    request = {"cmd": command, "ts": time.perf_counter_ns()}
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        return json.loads(sock.makefile("rb").readline())
+
+
+def run_tk(host=HOST, port=PORT, start_hidden=False):
+    """Resident Tk lockscreen: everything is loaded once, the window is withdrawn between locks"""
+    import queue
+    import tkinter as tk
+    from lockscreen import KeystrokeLockscreen
+
+    service = LockService()
+    root = tk.Tk()
+    commands = queue.SimpleQueue()
+
+    if root.tk.eval("info exists tcl_platform(threaded)") == "1":
+        # Threaded Tcl marshals calls from the IPC thread onto the Tk thread itself
+        def dispatch(fn):
+            root.after(0, fn)
+    else:
+        def dispatch(fn):
+            commands.put(fn)
+
+        def pump():
+            while not commands.empty():
+                commands.get()()
+            root.after(POLL_MS, pump)
+        pump()
+
+    try:
+        server = serve_commands(service, dispatch, host, port)
+    except OSError:
+        print("Lockscreen service is already running.")
+        root.destroy()
+        return
+
+    app = KeystrokeLockscreen(root, resident=True)
+    service.view = app
+    app.on_unlock = service.unlocked
+    app.on_hide = service.hidden
+    app.on_shown = service.shown
+    # <Map> fires once the window is actually mapped on screen
+    root.bind("<Map>", lambda e: service.shown() if e.widget is root else None)
+    logging.info("Lockscreen service started")
+    if not start_hidden:
+        root.after_idle(service.lock)
+    try:
+        root.mainloop()
+    finally:
+        server.shutdown()
+
+
+def run_stand_in(host=HOST, port=PORT, unlock_delay=STAND_IN_UNLOCK_DELAY):
+    """The service with StandInView in place of Tk, for exercising IPC and state changes anywhere"""
+    view = StandInView(unlock_delay)
+    service = LockService(view)
+    view.service = service
+
+    def dispatch(fn):
+        with view.mutex:
+            fn()
+    return service, serve_commands(service, dispatch, host, port)
+
+
+def self_test(triggers, port=0):
+    """Drive a stand-in service with lock commands; returns its stats"""
+    service, server = run_stand_in(port=port)
+    port = server.server_address[1]
+    try:
+        for _ in range(triggers):
+            send_command("lock", port=port)
+            # A repeat trigger while visible must be ignored
+            send_command("lock", port=port)
+            deadline = time.monotonic() + 1.0
+            while service.state != HIDDEN and time.monotonic() < deadline:
+                time.sleep(0.005)
+            assert service.state == HIDDEN, service.state
+        return send_command("status", port=port)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resident lockscreen that shows on a \"lock\" command")
+    parser.add_argument("mode", choices=["serve", "lock", "status", "stand-in", "self-test"], nargs="?", default="serve")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--hidden", action="store_true", help="Start hidden instead of locking right away")
+    parser.add_argument("--triggers", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.mode == "serve":
+        run_tk(port=args.port, start_hidden=args.hidden)
+    elif args.mode == "stand-in":
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        run_stand_in(port=args.port)
+        print(f"Stand-in lockscreen service on {HOST}:{args.port}; trigger it with \"lockscreen_service.py lock\"")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+    elif args.mode == "self-test":
+        stats = self_test(args.triggers)
+        print(json.dumps(stats, indent=2))
+        print(f"✅ {stats['locks']} locks, {stats['ignored']} repeat triggers ignored")
+    else:
+        try:
+            print(json.dumps(send_command(args.mode, port=args.port), indent=2))
+        except OSError as e:
+            print(f"❌ No lockscreen service on port {args.port}: {e}")
@@ -0,0 +1,152 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import time
+
+# inotify flags (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+POLL_INTERVAL = 0.5  # Seconds between checks when inotify is unavailable
+INOTIFY_TIMEOUT = 5.0  # Safety re-check interval when inotify wakes us on changes
+READ_SIZE = 65536
+
+
+class _Inotify:
+    """Minimal ctypes binding: one directory watch, readable when anything changes"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch failed")
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if readable:
+            # Drain the queued events; which ones fired doesn't matter, we re-stat anyway
+            try:
+                while os.read(self.fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LogTailer:
+    """Follows a growing log by byte offset, never rereading what was already seen
+
+    Wakes on inotify where available and polls otherwise. Each wake costs one
+    stat plus reading only the appended bytes, however large the file grows.
+    Truncation (size below our offset) and rotation (a new inode at the path)
+    restart reading from the top of the new file.
+    """
+
+    def __init__(self, path, from_end=True, poll_interval=POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.from_end = from_end
+        self.file = None
+        self.inode = None
+        self.offset = 0
+        self._partial = b""
+        try:
+            self._inotify = _Inotify(os.path.dirname(os.path.abspath(path)))
+        except (OSError, AttributeError):
+            self._inotify = None
+
+    def _open(self, seek_end):
+        try:
+            self.file = open(self.path, "rb")
+        except FileNotFoundError:
+            self.file = None
+            return
+        stat = os.fstat(self.file.fileno())
+        self.inode = (stat.st_dev, stat.st_ino)
+        self.offset = stat.st_size if seek_end else 0
+        self.file.seek(self.offset)
+        self._partial = b""
+
+    def _read_appended(self):
+        chunks = []
+        while True:
+            chunk = self.file.read(READ_SIZE)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self.offset += len(chunk)
+        return b"".join(chunks)
+
+    def read_new(self):
+        """Complete lines appended since the last call (non-blocking)"""
+        if self.file is None:
+            self._open(self.from_end)
+            self.from_end = False  # A file that appears later is read from its start
+            if self.file is None:
+                return []
+
+        data = b""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+        if stat is None or (stat.st_dev, stat.st_ino) != self.inode:
+            # Rotated or removed: finish the old file, then switch to the new one
+            data = self._partial + self._read_appended()
+            if data and not data.endswith(b"\n"):
+                data += b"\n"  # The old file's unterminated last line is complete now
+            self.file.close()
+            self._open(seek_end=False)
+            if self.file is not None:
+                data += self._read_appended()
+        elif stat.st_size < self.offset:
+            # Truncated in place
+            self.file.seek(0)
+            self.offset = 0
+            self._partial = b""
+            data = self._read_appended()
+        elif stat.st_size > self.offset:
+            data = self._read_appended()
+
+        if not data:
+            return []
+        data = self._partial + data
+        *lines, self._partial = data.split(b"\n")
+        return [line.decode("utf-8", errors="replace").rstrip("\r") for line in lines]
+
+    def wait(self, timeout=None):
+        """Sleep until the file (probably) changed"""
+        if self._inotify is not None:
+            self._inotify.wait(INOTIFY_TIMEOUT if timeout is None else timeout)
+        else:
+            time.sleep(self.poll_interval if timeout is None else timeout)
+
+    def follow(self):
+        """Yield new lines forever"""
+        while True:
+            lines = self.read_new()
+            if lines:
+                yield from lines
+            else:
+                self.wait()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        if self._inotify is not None:
+            self._inotify.close()
@@ -0,0 +1,110 @@
+import argparse
+import random
+import time
+import numpy as np
+
+# Matrix Rain parameters
+GLYPHS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+COLUMN_SPACING = 10
+DROPS_PER_COLUMN = 10
+MIN_SPEED, MAX_SPEED = 5, 15
+FRAME_MS = 50
+FONT = ('Courier', 15)
+TAG = 'matrix_char'
+
+
+class MatrixRain:
+    """Retained-mode Matrix Rain: canvas items are created once and moved each frame
+
+    Drop state lives in NumPy arrays. Every drop is tagged with its speed, so a
+    frame is one vectorized position update, one canvas move per distinct speed,
+    and individual item updates only for the few drops that wrapped around.
+    """
+
+    def __init__(self, canvas, width, height, seed=None):
+        self.canvas = canvas
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+        self.x = np.repeat(np.arange(0, width, COLUMN_SPACING), DROPS_PER_COLUMN)
+        n_drops = len(self.x)
+        self.y = self.rng.integers(-height, 1001, size=n_drops)
+        self.speed = self.rng.integers(MIN_SPEED, MAX_SPEED + 1, size=n_drops)
+        self.glyph = self.rng.integers(0, len(GLYPHS), size=n_drops)
+        self.items = [
+            canvas.create_text(x, y, text=GLYPHS[g], fill='lime', font=FONT, tags=(TAG, f'speed{s}'))
+            for x, y, s, g in zip(self.x.tolist(), self.y.tolist(), self.speed.tolist(), self.glyph.tolist())
+        ]
+
+    def step(self):
+        """Advance every drop by one frame"""
+        self.y += self.speed
+        for speed in range(MIN_SPEED, MAX_SPEED + 1):
+            self.canvas.move(f'speed{speed}', 0, speed)
+
+        wrapped = np.flatnonzero(self.y > self.height)
+        if len(wrapped):
+            self.y[wrapped] = self.rng.integers(-self.height, 1, size=len(wrapped))
+            self.speed[wrapped] = self.rng.integers(MIN_SPEED, MAX_SPEED + 1, size=len(wrapped))
+            self.glyph[wrapped] = self.rng.integers(0, len(GLYPHS), size=len(wrapped))
+            for i in wrapped.tolist():
+                item = self.items[i]
+                self.canvas.coords(item, int(self.x[i]), int(self.y[i]))
+                self.canvas.itemconfigure(item, text=GLYPHS[self.glyph[i]], tags=(TAG, f'speed{self.speed[i]}'))
+
+
+class _LegacyRain:
+    """The previous immediate-mode renderer, kept only as a benchmark baseline"""
+
+    def __init__(self, canvas, width, height):
+        self.canvas = canvas
+        self.height = height
+        self.drops = [{'x': x, 'y': random.randint(-height, 1000), 'speed': random.randint(MIN_SPEED, MAX_SPEED),
+                       'char': random.choice(GLYPHS)}
+                      for x in range(0, width, COLUMN_SPACING) for _ in range(DROPS_PER_COLUMN)]
+
+    def step(self):
+        self.canvas.delete('all')
+        for drop in self.drops:
+            self.canvas.create_text(drop['x'], drop['y'], text=drop['char'], fill='lime', font=FONT, tags=TAG)
+            drop['y'] += drop['speed']
+            if drop['y'] > self.height:
+                drop['y'] = random.randint(-self.height, 0)
+                drop['char'] = random.choice(GLYPHS)
+                drop['speed'] = random.randint(MIN_SPEED, MAX_SPEED)
+
+
+def benchmark(width, height, frames):
+    """Frame times (ms) of the legacy and retained renderers; runs under Xvfb"""
+    import tkinter as tk
+    root = tk.Tk()
+    results = {}
+    try:
+        for name, renderer in (("legacy", _LegacyRain), ("retained", MatrixRain)):
+            canvas = tk.Canvas(root, width=width, height=height, bg='black', highlightthickness=0)
+            canvas.pack()
+            rain = renderer(canvas, width, height)
+            root.update()
+            times = []
+            for _ in range(frames):
+                start = time.perf_counter()
+                rain.step()
+                root.update_idletasks()  # Include the redraw, not just the item updates
+                times.append((time.perf_counter() - start) * 1000)
+            canvas.destroy()
+            results[name] = np.array(times)
+    finally:
+        root.destroy()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Matrix Rain frame-time benchmark (e.g. xvfb-run python matrix_rain.py)")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    for name, times in benchmark(args.width, args.height, args.frames).items():
+        p50, p99 = np.percentile(times, [50, 99])
+        print(f"{name:<9} mean {times.mean():7.2f} ms  p50 {p50:7.2f} ms  p99 {p99:7.2f} ms  "
+              f"({times.mean() / FRAME_MS * 100:.0f}% of the {FRAME_MS} ms frame budget)")
@@ -0,0 +1,237 @@
+"""Fixed-bucket latency histograms with Prometheus text export.
+
+Disabled (the default) every call returns at once: span() hands back one
+shared no-op context manager and observe() returns before touching a lock.
+Enable with KEYSTROKE_METRICS=1, or call configure(). Only the standard
+library is imported, so this is safe on the verification path.
+"""
+import argparse
+import atexit
+import bisect
+import os
+import re
+import threading
+import time
+
+# Histogram bucket upper bounds in seconds: 10 µs to 10 s, roughly 1-2.5-5 per decade
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "keystroke_"
+METRICS_FILE = os.environ.get("KEYSTROKE_METRICS_FILE", "lockscreen_metrics.prom")
+METRICS_PORT = int(os.environ.get("KEYSTROKE_METRICS_PORT", "0"))  # 0: no HTTP endpoint
+EXPORT_INTERVAL = 10.0  # Seconds between text file rewrites
+
+_enabled = os.environ.get("KEYSTROKE_METRICS", "").lower() in ("1", "true", "yes", "on")
+_histograms = {}
+_registry_lock = threading.Lock()
+
+
+class Histogram:
+    """Cumulative-on-export histogram over fixed bucket bounds"""
+
+    def __init__(self, name, help_text="", buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside its bucket, as Prometheus does"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return float("nan")
+        return _bucket_quantile(q, self.buckets, counts)
+
+    def render(self):
+        with self._lock:
+            counts, total, sum_ = list(self.counts), self.count, self.sum
+        name = PREFIX + self.name + "_seconds"
+        lines = [f"# HELP {name} {self.help or self.name}", f"# TYPE {name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {total}')
+        lines.append(f"{name}_sum {sum_:.9f}")
+        lines.append(f"{name}_count {total}")
+        return "\n".join(lines)
+
+
+def _bucket_quantile(q, buckets, counts):
+    rank = q * sum(counts)
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if cumulative + count >= rank and count:
+            if i == len(buckets):
+                return buckets[-1]  # Beyond the last bound: report the bound
+            lower = buckets[i - 1] if i else 0.0
+            return lower + (buckets[i] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return buckets[-1]
+
+
+def histogram(name, help_text=""):
+    """Get or create the histogram registered under name"""
+    hist = _histograms.get(name)
+    if hist is None:
+        with _registry_lock:
+            hist = _histograms.setdefault(name, Histogram(name, help_text))
+    return hist
+
+
+def observe(name, seconds):
+    """Record one duration (seconds) if metrics are enabled"""
+    if _enabled:
+        histogram(name).observe(seconds)
+
+
+class _Span:
+    __slots__ = ("hist", "start")
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """Context manager timing its body into histogram name"""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(histogram(name))
+
+
+def enabled():
+    return _enabled
+
+
+def render():
+    """All histograms in Prometheus text exposition format"""
+    return "\n".join(hist.render() for _, hist in sorted(_histograms.items())) + "\n"
+
+
+def write_textfile(path=METRICS_FILE):
+    """Atomically rewrite a node_exporter textfile-collector file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        file.write(render())
+    os.replace(tmp_path, path)
+
+
+def _serve(port):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def configure(enable=True, textfile=METRICS_FILE, port=METRICS_PORT, interval=EXPORT_INTERVAL):
+    """Turn metrics on or off and start exporting: a text file every interval and/or GET /metrics on localhost"""
+    global _enabled
+    _enabled = enable
+    if not enable:
+        return None
+    server = _serve(port) if port else None
+    if textfile:
+        def export():
+            while True:
+                time.sleep(interval)
+                write_textfile(textfile)
+        threading.Thread(target=export, daemon=True).start()
+        atexit.register(write_textfile, textfile)
+    return server
+
+
+def configure_from_env():
+    """Start exporting if KEYSTROKE_METRICS enabled metrics at import"""
+    if _enabled:
+        return configure()
+    return None
+
+
+def read_textfile(path):
+    """Parse histograms back out of an exported file: {name: (bounds, per-bucket counts)}"""
+    cumulative = {}
+    pattern = re.compile(r'^(\w+)_seconds_bucket\{le="([^"]+)"\} (\d+)$')
+    with open(path) as file:
+        for line in file:
+            match = pattern.match(line.strip())
+            if match:
+                name, bound, count = match.groups()
+                cumulative.setdefault(name, []).append((float(bound), int(count)))
+    result = {}
+    for name, points in cumulative.items():
+        bounds = tuple(bound for bound, _ in points[:-1])
+        totals = [count for _, count in points]
+        result[name[len(PREFIX):] if name.startswith(PREFIX) else name] = (
+            bounds, [b - a for a, b in zip([0] + totals[:-1], totals)])
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarise an exported metrics file as p50/p99 per span")
+    parser.add_argument("path", nargs="?", default=METRICS_FILE)
+    parser.add_argument("--overhead", action="store_true", help="Measure the cost of a span, enabled and disabled")
+    args = parser.parse_args()
+
+    if args.overhead:
+        for state in (False, True):
+            _enabled = state
+            n = 200000
+            start = time.perf_counter()
+            for _ in range(n):
+                with span("overhead"):
+                    pass
+            print(f"{'enabled' if state else 'disabled':<9} {(time.perf_counter() - start) / n * 1e9:7.0f} ns per span")
+    else:
+        print(f"{'span':<32}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, (bounds, counts) in sorted(read_textfile(args.path).items()):
+            total = sum(counts)
+            if total:
+                print(f"{name:<32}{total:>8}{_bucket_quantile(0.5, bounds, counts) * 1000:>10.3f}"
+                      f"{_bucket_quantile(0.99, bounds, counts) * 1000:>10.3f}")
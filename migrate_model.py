@@ -0,0 +1,36 @@
+import os
+import pickle
+import sys
+from template import LEGACY_MODEL_FILE, MODEL_FILE, load_template
+from template_store import DEFAULT_USER, get_store
+
+
+def migrate(source=LEGACY_MODEL_FILE, user_id=DEFAULT_USER):
+    """Import a pickled model or standalone template file into the template store"""
+    if source.endswith(".pkl"):
+        # Unpickling the fitted StandardScaler still needs sklearn, but only here
+        with open(source, "rb") as model_file:
+            model = pickle.load(model_file)
+    else:
+        model = load_template(source, mmap=False)
+        model.pop("version", None)
+    store = get_store()
+    store.put(user_id, model)
+
+    # Read it back to make sure the template opens without sklearn
+    template = store.get(user_id)
+    print(f"Migrated {source} -> {store.path_for(user_id)} for user {user_id!r} "
+          f"({template['train_data'].shape[0]} samples, {template['train_data'].shape[1]} features)")
+    return template
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        source = sys.argv[1]
+    else:
+        source = next((path for path in (MODEL_FILE, LEGACY_MODEL_FILE) if os.path.exists(path)), LEGACY_MODEL_FILE)
+    user_id = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_USER
+    if not os.path.exists(source):
+        print(f"No model found at {source}")
+        sys.exit(1)
+    migrate(source, user_id)
@@ -0,0 +1,154 @@
+import argparse
+import os
+import sys
+import tempfile
+import numpy as np
+from template_store import get_store
+from verify_core import fold_scaler
+from scorers import DEFAULT_SCORER, get_scorer
+from train_auth import flag_outliers
+
+# Defaults
+WINDOW_SIZE = 50  # Most recent accepted attempts kept as template rows
+COMPACT_EVERY = 20  # Journalled updates folded into a new template generation
+
+
+class OnlineUpdater:
+    """Adapts a user's template to accepted attempts at O(d) cost per unlock
+
+    Each accepted sample updates a running mean/variance (Welford) and replaces
+    the oldest row of a sliding window, and is appended to a journal. Every
+    COMPACT_EVERY updates the state is written out as a new template generation
+    with a fresh journal; until then the template on disk is left untouched.
+    """
+
+    def __init__(self, user_id, store=None, window_size=WINDOW_SIZE, compact_every=COMPACT_EVERY):
+        self.user_id = user_id
+        self.store = store or get_store()
+        self.window_size = window_size
+        self.compact_every = compact_every
+        self._load(self.store.get(user_id))
+        self._replay()
+
+    def _load(self, model):
+        self.model = model
+        # Each template generation has its own journal, so a crash between writing
+        # the new template and discarding the old journal never replays twice
+        self.journal_path = self.store.journal_path(self.user_id)
+        mean = np.array(model["mean"], dtype=np.float64)
+        scale = np.array(model["scale"], dtype=np.float64)
+        raw = np.asarray(model["train_data"]) * scale + mean
+        self.n_features = len(mean)
+        self.count = int(model.get("n_samples", len(raw)))
+        self.mean = mean
+        self.m2 = scale ** 2 * self.count
+        # Ring buffer of raw attempts, newest overwriting oldest once full
+        self.window = np.empty((self.window_size, self.n_features))
+        kept = raw[-self.window_size:]
+        self.window[:len(kept)] = kept
+        self.window_fill = len(kept)
+        self.window_pos = len(kept) % self.window_size
+        self.pending = 0
+
+    def _replay(self):
+        """Re-apply updates journalled since the last compaction"""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "rb") as journal:
+            data = journal.read()
+        record_size = self.n_features * np.dtype(np.float64).itemsize
+        usable = len(data) - len(data) % record_size
+        if usable < len(data):
+            # A crash mid-append left a partial record at the end; cut it off so
+            # the next append starts on a record boundary instead of after it
+            os.truncate(self.journal_path, usable)
+        for sample in np.frombuffer(data, dtype=np.float64, count=usable // 8).reshape(-1, self.n_features):
+            self._apply(sample)
+
+    def _apply(self, sample):
+        self.count += 1
+        delta = sample - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (sample - self.mean)
+        self.window[self.window_pos] = sample
+        self.window_pos = (self.window_pos + 1) % self.window_size
+        self.window_fill = min(self.window_fill + 1, self.window_size)
+        self.pending += 1
+
+    def accept(self, features):
+        """Fold one accepted attempt (raw intervals) into the template"""
+        sample = np.asarray(features, dtype=np.float64).reshape(self.n_features)
+        self._apply(sample)
+        with open(self.journal_path, "ab") as journal:
+            sample.tofile(journal)
+        if self.pending >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Write the adapted template as a new generation, superseding the journal"""
+        if not self.pending:
+            return self.model
+        scale = np.sqrt(self.m2 / self.count)
+        scale[scale == 0] = 1.0
+        # Oldest first, so the ring keeps overwriting the oldest row after reloading
+        raw = np.roll(self.window[:self.window_fill], -self.window_pos if self.window_fill == self.window_size else 0, axis=0)
+        train_data = (raw - self.mean) / scale
+        scorer = get_scorer(self.model.get("scorer", DEFAULT_SCORER))(-self.mean / scale).fit(train_data)
+        self_similarities = scorer.leave_one_out(train_data)
+
+        model = {key: value for key, value in self.model.items()
+                 if not isinstance(value, np.ndarray) and key != "version"}
+        model.update({
+            "train_data": train_data,
+            "mean": self.mean.copy(),
+            "scale": scale,
+            "n_samples": self.count,
+            "avg_self_similarity": float(np.mean(self_similarities)),
+            "min_self_similarity": float(np.min(self_similarities)),
+            "self_similarities": self_similarities,
+            "outliers": flag_outliers(self_similarities),
+            **scorer.serialize(),
+        })
+        self.store.put(self.user_id, fold_scaler(model))
+        self._load(self.store.get(self.user_id))
+        return self.model
+
+
+def check_torn_journal(n_features=10, seed=0):
+    """Simulate a crash mid-append and check that later updates still replay exactly"""
+    from template_store import TemplateStore
+    from train_auth import build_model
+    from workload import synthetic_users
+
+    samples = synthetic_users(1, n_features, 30, seed)[0]
+    model = build_model(samples[:20], calibrate=False)
+    with tempfile.TemporaryDirectory() as crashed_root, tempfile.TemporaryDirectory() as clean_root:
+        crashed, clean = TemplateStore(crashed_root), TemplateStore(clean_root)
+        crashed.put("user", model)
+        clean.put("user", model)
+
+        updater = OnlineUpdater("user", crashed, compact_every=100)
+        for sample in samples[20:25]:
+            updater.accept(sample)
+        with open(updater.journal_path, "ab") as journal:
+            journal.write(samples[25].tobytes()[:20])  # The crash: a torn final record
+        updater = OnlineUpdater("user", crashed, compact_every=100)
+        for sample in samples[26:]:
+            updater.accept(sample)
+
+        updater = OnlineUpdater("user", clean, compact_every=100)
+        for sample in np.concatenate([samples[20:25], samples[26:]]):
+            updater.accept(sample)
+
+        recovered = OnlineUpdater("user", crashed, compact_every=100)
+        expected = OnlineUpdater("user", clean, compact_every=100)
+        return recovered.pending == expected.pending and np.array_equal(recovered.mean, expected.mean)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Online template update self-checks")
+    parser.add_argument("--check", action="store_true", required=True)
+    parser.parse_args()
+
+    ok = check_torn_journal()
+    print(f"Torn journal tail recovery: {'✅' if ok else '❌'}")
+    sys.exit(0 if ok else 1)
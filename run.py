@@ -1,28 +1,35 @@
-import re
 import sys
-import os
-import pickle
 import numpy as np
 import time
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-import threading
-import keyboard
-from sklearn.preprocessing import StandardScaler
+from train_auth import build_model
+from template_store import DEFAULT_USER, get_store
+from capture import KeystrokeBuffer, InputCapture
+from config_store import get_config
 
-# File paths
-LOCKSCREEN_FILE = "lockscreen.py"
-TRAIN_AUTH_FILE = "train_auth.py"
-MODEL_FILE = "typing_model.pkl"
+RELEASE_GRACE_MS = 500  # Finish an attempt this long after the last press even if a release went missing
 
 class KeystrokeRecorder:
-    def __init__(self, parent, password):
+    """Records one enrollment attempt, driven entirely by key events
+
+    Keys come from the app's persistent InputCapture hook (stamped on the hook
+    thread, so Tk wakeups don't skew them) or, without one, from Tk key
+    bindings. Either way nothing polls: the hook thread schedules a drain on
+    the Tk loop, and the attempt ends once the password has been typed and
+    released. The caller waits on the dialog with wait_window.
+    """
+
+    def __init__(self, parent, password, capture=None):
         self.parent = parent
         self.password = password
-        self.typed = ""
-        self.times = []
-        self.last_time = None
+        self.keystrokes = KeystrokeBuffer()
         self.recording = False
+        self.grace = None
+        self.capture = capture
+        # Hook-thread calls into Tk are only safe when Tcl marshals them itself
+        if capture is not None and parent.tk.eval("info exists tcl_platform(threaded)") != "1":
+            self.capture = None
         
         # Create a dialog
         self.dialog = tk.Toplevel(parent)
@@ -54,56 +61,79 @@ class KeystrokeRecorder:
         tk.Button(self.dialog, text="Start Recording", command=self.start_recording).pack(pady=10)
         
         self.result = None
+        self.dialog.bind('<KeyPress>', self.on_tk_key)
+        self.dialog.bind('<KeyRelease>', self.on_tk_key)
+        self.dialog.bind('<Destroy>', self.on_destroy)
 
     def start_recording(self):
         self.status_var.set("Recording... Type the password")
-        self.recording = True
-        self.typed = ""
-        self.times = []
-        self.last_time = None
+        self.keystrokes.clear()
         self.password_var.set("")
-        
-        # Start keyboard hook in a separate thread
-        threading.Thread(target=self.record_keys, daemon=True).start()
-    
-    def record_keys(self):
-        keyboard.on_press(self.on_key_press)
-        
-        # Wait until recording is done
-        while self.recording and len(self.typed) < len(self.password):
-            time.sleep(0.01)
-            
-        keyboard.unhook_all()
-        
+        self.recording = True
+        self.dialog.focus_force()
+        if self.capture is not None:
+            self.capture.drain()  # Discard keys typed before this attempt
+            self.capture.notify = lambda: self.dialog.after(0, self.drain_capture)
+            self.capture.paused = False
+
+    def drain_capture(self):
+        """Tk thread: apply the key events the hook thread queued"""
+        if self.capture is None:
+            return
+        for event_type, name, timestamp_ns in self.capture.drain():
+            if name is not None and len(name) == 1:
+                self.on_key(event_type == "down", name, timestamp_ns)
+
+    def on_tk_key(self, event):
+        """Fallback when there is no keyboard hook: Tk events timed in the handler"""
+        if self.capture is None and event.char and event.char.isprintable():
+            self.on_key(event.type == tk.EventType.KeyPress, event.char, time.perf_counter_ns())
+
+    def on_key(self, pressed, char, timestamp_ns):
+        if not self.recording:
+            return
+        if pressed:
+            if len(self.keystrokes) < len(self.password):
+                self.keystrokes.press(char, timestamp_ns)
+                self.password_var.set("*" * len(self.keystrokes))
+        else:
+            self.keystrokes.release(char, timestamp_ns)
+        records = self.keystrokes.records()
+        if len(records) < len(self.password):
+            return
+        # Done once every key of the password has been pressed and let go
+        if (records["release_ns"] != 0).all():
+            self.finish()
+        elif pressed and self.grace is None:
+            self.grace = self.dialog.after(RELEASE_GRACE_MS, self.finish)
+
+    def finish(self):
+        if not self.recording:
+            return
+        self.recording = False
+        if self.grace is not None:
+            self.dialog.after_cancel(self.grace)
+            self.grace = None
+        if self.capture is not None:
+            self.capture.paused = True
+            self.capture.notify = None
+
         # Check if password is correct
-        if self.typed == self.password:
+        if self.keystrokes.text == self.password:
             self.status_var.set("✅ Recording complete!")
-            self.result = self.times
+            self.result = self.keystrokes.intervals().tolist()
             # Close dialog after a short delay
             self.dialog.after(1000, self.dialog.destroy)
         else:
             self.status_var.set("❌ Incorrect password! Try again.")
             self.password_var.set("")
-    
-    def on_key_press(self, event):
-        if not self.recording:
-            return
-            
-        current_time = time.time()
-        
-        # Only process regular keys
-        if len(event.name) == 1:
-            self.typed += event.name
-            self.password_var.set("*" * len(self.typed))
-            
-            if self.last_time is not None:
-                self.times.append(current_time - self.last_time)
-            
-            self.last_time = current_time
-            
-            # Check if we've completed the password
-            if len(self.typed) >= len(self.password):
-                self.recording = False
+
+    def on_destroy(self, event):
+        if event.widget is self.dialog:
+            self.recording = False
+            if self.capture is not None:
+                self.capture.paused = True
+                self.capture.notify = None
 
 class UpdateApp:
     def __init__(self, root):
@@ -111,6 +141,7 @@ class UpdateApp:
         self.root.title("Typing Authentication Settings")
         self.root.geometry("600x500")
         self.root.resizable(False, False)
+        self.capture = None
         
         # Set up the main frame
         main_frame = ttk.Frame(root, padding="20")
@@ -154,7 +185,12 @@ class UpdateApp:
         self.status_text.config(state=tk.DISABLED)
         
     def get_keystroke_times(self, password):
-        recorder = KeystrokeRecorder(self.root, password)
+        if self.capture is None:
+            # One hook for the whole session, paused between attempts
+            self.capture = InputCapture.start()
+            if self.capture is not None:
+                self.capture.paused = True
+        recorder = KeystrokeRecorder(self.root, password, self.capture)
         self.root.wait_window(recorder.dialog)
         return password, recorder.result
         
@@ -177,14 +213,7 @@ class UpdateApp:
         return np.array(data) if data else np.array([])
         
     def train_model(self):
-        # Get current password from train_auth.py
-        with open(TRAIN_AUTH_FILE, "r") as file:
-            content = file.read()
-        match = re.search(r'PASSWORD\s*=\s*"(.+?)"', content)
-        if not match:
-            self.log("❌ Error: Could not retrieve password from train_auth.py")
-            return
-        password = match.group(1)
+        password = get_config().get("password")
 
         # Collect user typing data
         train_data = self.collect_typing_data(password, n_attempts=5)
@@ -192,24 +221,18 @@ class UpdateApp:
             self.log("❌ No valid typing data collected. Model training aborted.")
             return
 
-        scaler = StandardScaler()
-        scaled_train_data = scaler.fit_transform(train_data)
-
-        model = {
-            "train_data": scaled_train_data,
-            "scaler": scaler,
-            "avg_self_similarity": np.mean(scaled_train_data),
-            "min_self_similarity": np.min(scaled_train_data)
-        }
+        model = build_model(train_data, get_config().get("scorer"))
 
-        # Remove old model if exists
-        if os.path.exists(MODEL_FILE):
-            os.remove(MODEL_FILE)
-
-        with open(MODEL_FILE, "wb") as model_file:
-            pickle.dump(model, model_file)
+        # Replaces any old model atomically
+        get_store().put(DEFAULT_USER, model)
 
         self.log("✅ New model trained and saved successfully!")
+        self.log(f"Average self-similarity score: {model['avg_self_similarity']:.3f}")
+        if "threshold" in model:
+            self.log(f"Calibrated threshold: {model['threshold']:.3f} "
+                     f"(95% CI {model['threshold_low']:.3f}-{model['threshold_high']:.3f})")
+        if model["outliers"].any():
+            self.log(f"⚠️ {int(model['outliers'].sum())} attempt(s) look like outliers; consider retraining.")
     
     def update_password(self):
         choice = messagebox.askyesno("Password Update", "Do you want to change the password?\n(Yes = change password & train model, No = only train model)")
@@ -217,11 +240,7 @@ class UpdateApp:
         if choice:
             new_password = simpledialog.askstring("New Password", "Enter new password:", parent=self.root)
             if new_password:
-                with open(TRAIN_AUTH_FILE, "r") as file:
-                    content = file.read()
-                content = re.sub(r'PASSWORD\s*=\s*".*?"', f'PASSWORD = "{new_password}"', content)
-                with open(TRAIN_AUTH_FILE, "w") as file:
-                    file.write(content)
+                get_config().update(password=new_password)
                 self.log("✅ Password updated successfully!")
             else:
                 self.log("Password change cancelled.")
@@ -230,13 +249,14 @@ class UpdateApp:
         self.train_model()
         
     def update_threshold(self):
-        new_threshold = simpledialog.askstring("Update Threshold", "Enter new threshold (e.g., 0.10):", parent=self.root)
+        new_threshold = simpledialog.askstring("Update Threshold", "Enter new fallback threshold (e.g., 0.10).\nIt applies to models trained without a calibrated threshold:", parent=self.root)
         if new_threshold:
-            with open(TRAIN_AUTH_FILE, "r") as file:
-                content = file.read()
-            content = re.sub(r'THRESHOLD\s*=\s*[\d\.]+', f'THRESHOLD = {new_threshold}', content)
-            with open(TRAIN_AUTH_FILE, "w") as file:
-                file.write(content)
+            try:
+                threshold = float(new_threshold)
+            except ValueError:
+                self.log(f"❌ Invalid threshold: {new_threshold}")
+                return
+            get_config().update(threshold=threshold)
             self.log("✅ Threshold updated successfully!")
         else:
             self.log("Threshold update cancelled.")
@@ -246,14 +266,7 @@ class UpdateApp:
         self.root.wait_window(questions_dialog.dialog)
         
         if questions_dialog.questions:
-            with open(LOCKSCREEN_FILE, "r") as file:
-                content = file.read()
-            
-            new_questions_str = "{\n" + "\n".join(f'    \"{q}\": \"{a}\",' for q, a in questions_dialog.questions.items()) + "\n}"
-            content = re.sub(r'self\.security_questions\s*=\s*{.*?}', f'self.security_questions = {new_questions_str}', content, flags=re.DOTALL)
-
-            with open(LOCKSCREEN_FILE, "w") as file:
-                file.write(content)
+            get_config().update(security_questions=questions_dialog.questions)
             self.log("✅ Security questions updated successfully!")
         else:
             self.log("Security questions update cancelled.")
@@ -261,11 +274,7 @@ class UpdateApp:
     def update_matrix_character(self):
         new_character = simpledialog.askstring("Matrix Character", "Enter new Matrix character to unlock security questions:", parent=self.root)
         if new_character:
-            with open(LOCKSCREEN_FILE, "r") as file:
-                content = file.read()
-            content = re.sub(r'if char == [\'\"].*?[\'\"]:', f'if char == \"{new_character}\":', content)
-            with open(LOCKSCREEN_FILE, "w") as file:
-                file.write(content)
+            get_config().update(matrix_character=new_character)
             self.log("✅ Matrix Rain character updated successfully!")
         else:
             self.log("Matrix character update cancelled.")
@@ -0,0 +1,373 @@
+"""Pluggable matchers that turn standardised interval vectors into similarity scores.
+
+Every scorer works on features already standardised with the template's
+mean/scale and returns similarities where higher means "more like the
+enrolled user". Scorers are looked up by the name stored in the template, so
+this module sits on the verification path and must only import numpy.
+"""
+import argparse
+import threading
+import time
+import numpy as np
+from scoring import score_batch, pairwise_distance_sums, as_template
+
+DEFAULT_SCORER = "euclidean"
+KNN_NEIGHBOURS = 3
+COVARIANCE_RIDGE = 0.1  # Added to the covariance diagonal; enrollments are too small for a full-rank estimate
+VARIANCE_FLOOR = 1e-2
+MAD_FLOOR = 1e-2
+BOUND_MARGIN = 1e-9  # Relative slack so float rounding can never let a bound overrule the exact rule
+CASCADE_BAND = None  # Opt-in approximate stage: relative band around the threshold distance; None keeps decisions exact
+
+# Decision cascade stages, cheapest first, and how many attempts each one settled
+CASCADE_STAGES = ("centroid", "band", "full")
+_cascade_counts = dict.fromkeys(CASCADE_STAGES, 0)
+_cascade_lock = threading.Lock()
+
+SCORERS = {}
+
+
+def register(cls):
+    """Class decorator adding a scorer to the registry under its name"""
+    SCORERS[cls.name] = cls
+    return cls
+
+
+def get_scorer(name=DEFAULT_SCORER):
+    """Scorer class registered under name"""
+    try:
+        return SCORERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown scorer {name!r}; available: {', '.join(sorted(SCORERS))}") from None
+
+
+def load_scorer(model):
+    """Scorer ready to use for a template (templates without a scorer field are Euclidean)"""
+    return get_scorer(model.get("scorer", DEFAULT_SCORER)).deserialize(model)
+
+
+def count_stages(**settled):
+    """Add attempts settled per cascade stage to the process-wide counters"""
+    with _cascade_lock:
+        for stage, count in settled.items():
+            _cascade_counts[stage] += count
+
+
+def cascade_stats(reset=False):
+    """Attempts settled by each cascade stage so far, with each stage's share"""
+    with _cascade_lock:
+        counts = dict(_cascade_counts)
+        if reset:
+            for stage in CASCADE_STAGES:
+                _cascade_counts[stage] = 0
+    total = sum(counts.values())
+    stats = {"attempts": total, **counts}
+    stats.update({f"{stage}_rate": counts[stage] / total if total else 0.0 for stage in CASCADE_STAGES})
+    return stats
+
+
+class Scorer:
+    """Interface for matchers: fit on enrollment rows, then score attempts
+
+    Fitted parameters named in params are saved in the template as
+    "scorer_<param>" arrays next to a "scorer" name field. origin is where a
+    raw all-zero attempt lands after standardising (-mean / scale); only
+    scorers that need the direction of the raw intervals use it.
+    """
+
+    name = None
+    params = ()
+
+    def __init__(self, origin=None):
+        self.origin = origin
+
+    def fit(self, train_data):
+        raise NotImplementedError
+
+    def score_batch(self, features):
+        raise NotImplementedError
+
+    def score(self, features):
+        return float(self.score_batch(np.atleast_2d(features))[0])
+
+    def decide_batch(self, features, threshold, band=CASCADE_BAND):
+        """Accept/reject each attempt; scorers may decide without computing exact scores"""
+        accepted = self.score_batch(features) >= threshold
+        count_stages(full=len(accepted))
+        return accepted
+
+    def leave_one_out(self, train_data):
+        """Similarity of each enrollment row to a scorer fitted on the other rows"""
+        train_data = as_template(train_data)
+        if len(train_data) < 2:
+            return np.ones(len(train_data))
+        rest = np.ones(len(train_data), dtype=bool)
+        scores = np.empty(len(train_data))
+        for i in range(len(train_data)):
+            rest[i] = False
+            scores[i] = type(self)(self.origin).fit(train_data[rest]).score(train_data[i])
+            rest[i] = True
+        return scores
+
+    def serialize(self):
+        """Template fields describing this fitted scorer"""
+        return {"scorer": self.name, **{f"scorer_{param}": getattr(self, param) for param in self.params}}
+
+    @classmethod
+    def deserialize(cls, model):
+        scorer = cls()
+        for param in cls.params:
+            setattr(scorer, param, model[f"scorer_{param}"])
+        return scorer
+
+    def nbytes(self):
+        """Template bytes this scorer needs beyond mean and scale"""
+        return sum(np.asarray(getattr(self, param)).nbytes for param in self.params)
+
+
+class _RowScorer(Scorer):
+    """Scorers that compare against the enrollment rows already stored as train_data"""
+
+    def fit(self, train_data):
+        self.rows = as_template(train_data)
+        return self
+
+    @classmethod
+    def deserialize(cls, model):
+        return cls().fit(model["train_data"])
+
+    def nbytes(self):
+        return self.rows.nbytes + super().nbytes()
+
+
+@register
+class EuclideanScorer(_RowScorer):
+    """1 / (1 + mean Euclidean distance to every enrollment row); the original matcher
+
+    Decisions usually take O(features) work, whatever the enrollment size. With
+    c the row centroid and r_i each row's distance to it, the mean distance D
+    of an attempt z satisfies ||z - c|| <= D (convexity) and
+    D <= min(||z - c|| + mean r_i, sqrt(||z - c||^2 + mean r_i^2)) (triangle
+    inequality, Jensen). Only attempts whose bounds straddle the threshold
+    are scored exactly.
+
+    Opt-in (band is not None): attempts the bounds leave open are next judged
+    by the RMS distance sqrt(||z - c||^2 + mean r_i^2), also O(features):
+    only those within band (relative) of the threshold distance go on to the
+    full comparison. The RMS is an upper bound on D, so this stage only ever
+    rejects, and its rejections are not proven: with sloppy enrollment rows
+    it rejects genuine near-misses that full scoring accepts.
+    """
+
+    name = "euclidean"
+    params = ("centroid", "spread")
+
+    def fit(self, train_data):
+        super().fit(train_data)
+        self.centroid = self.rows.mean(axis=0)
+        sq_radii = np.einsum('ij,ij->i', self.rows - self.centroid, self.rows - self.centroid)
+        self.spread = np.array([np.sqrt(sq_radii).mean(), sq_radii.mean()])
+        return self
+
+    @classmethod
+    def deserialize(cls, model):
+        if "scorer_centroid" not in model:
+            # Templates written before the bounds were precomputed
+            return cls().fit(model["train_data"])
+        scorer = cls()
+        scorer.rows = as_template(model["train_data"])
+        scorer.centroid = model["scorer_centroid"]
+        scorer.spread = model["scorer_spread"]
+        return scorer
+
+    def score_batch(self, features):
+        return score_batch(features, self.rows)
+
+    def decide_batch(self, features, threshold, band=CASCADE_BAND):
+        features = as_template(features)
+        if threshold <= 0:
+            count_stages(centroid=len(features))
+            return np.ones(len(features), dtype=bool)
+        max_distance = 1 / threshold - 1
+        # Stage 1: exact bounds from the distance to the centroid
+        diff = features - self.centroid
+        sq_lower = np.einsum('ij,ij->i', diff, diff)
+        lower = np.sqrt(sq_lower)
+        rms = np.sqrt(sq_lower + self.spread[1])
+        accepted = np.minimum(lower + self.spread[0], rms) < max_distance * (1 - BOUND_MARGIN)
+        undecided = ~accepted & (lower <= max_distance * (1 + BOUND_MARGIN))
+        n_open = int(np.count_nonzero(undecided))
+        n_band = 0
+        if n_open and band is not None:
+            # Stage 2: the RMS estimate decides unless it falls inside the band
+            estimate = rms[undecided]
+            clear = np.abs(estimate - max_distance) > band * max_distance
+            if clear.any():
+                indices = np.flatnonzero(undecided)[clear]
+                accepted[indices] = estimate[clear] <= max_distance
+                undecided[indices] = False
+                n_band = int(np.count_nonzero(clear))
+        if n_open > n_band:
+            # Stage 3: the full comparison against every enrollment row
+            accepted[undecided] = self.score_batch(features[undecided]) >= threshold
+        count_stages(centroid=len(features) - n_open, band=n_band, full=n_open - n_band)
+        return accepted
+
+    def leave_one_out(self, train_data):
+        n_samples = len(train_data)
+        return 1 / (1 + pairwise_distance_sums(train_data) / max(n_samples - 1, 1))
+
+
+@register
+class KNNScorer(_RowScorer):
+    """1 / (1 + mean distance to the nearest KNN_NEIGHBOURS enrollment rows)"""
+
+    name = "knn"
+
+    def score_batch(self, features):
+        features = as_template(features, dtype=self.rows.dtype)
+        k = min(KNN_NEIGHBOURS, len(self.rows))
+        sq = (np.einsum('ij,ij->i', features, features)[:, None] - 2 * features @ self.rows.T
+              + np.einsum('ij,ij->i', self.rows, self.rows)[None, :])
+        nearest = np.partition(np.maximum(sq, 0), k - 1, axis=1)[:, :k]
+        return 1 / (1 + np.sqrt(nearest).mean(axis=1))
+
+
+@register
+class CosineScorer(_RowScorer):
+    """Mean cosine similarity to the enrollment rows, mapped to [0, 1]
+
+    Angles are taken between intervals / scale, not the standardised rows:
+    those are centred on the enrollment mean, so their directions are noise.
+    """
+
+    name = "cosine"
+
+    def fit(self, train_data):
+        if self.origin is None:
+            raise ValueError("The cosine scorer needs the template's origin (-mean / scale)")
+        super().fit(train_data)
+        rows = self.rows - self.origin
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        self.unit_rows = rows / np.where(norms == 0, 1, norms)
+        return self
+
+    @classmethod
+    def deserialize(cls, model):
+        origin = model["offset"] if "offset" in model else -np.asarray(model["mean"]) / model["scale"]
+        return cls(origin).fit(model["train_data"])
+
+    def score_batch(self, features):
+        features = as_template(features) - self.origin
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        cosines = (features / np.where(norms == 0, 1, norms)) @ self.unit_rows.T
+        return (1 + cosines.mean(axis=1)) / 2
+
+
+@register
+class ScaledManhattanScorer(Scorer):
+    """1 / (1 + sum of |x - mean| / mean absolute deviation), per Killourhy & Maxion"""
+
+    name = "scaled_manhattan"
+    params = ("center", "mad")
+
+    def fit(self, train_data):
+        train_data = as_template(train_data)
+        self.center = train_data.mean(axis=0)
+        self.mad = np.maximum(np.abs(train_data - self.center).mean(axis=0), MAD_FLOOR)
+        return self
+
+    def score_batch(self, features):
+        return 1 / (1 + (np.abs(as_template(features) - self.center) / self.mad).sum(axis=1))
+
+
+@register
+class MahalanobisScorer(Scorer):
+    """1 / (1 + Mahalanobis distance to the enrollment mean, ridge-regularised covariance)
+
+    Stores the Cholesky factor L of the precision matrix, so a distance is
+    ||(x - center) @ L||: one matrix product and a row norm.
+    """
+
+    name = "mahalanobis"
+    params = ("center", "whitening")
+
+    def fit(self, train_data):
+        train_data = as_template(train_data)
+        self.center = train_data.mean(axis=0)
+        centered = train_data - self.center
+        covariance = centered.T @ centered / max(len(train_data) - 1, 1)
+        covariance[np.diag_indices_from(covariance)] += COVARIANCE_RIDGE
+        self.whitening = np.linalg.cholesky(np.linalg.inv(covariance))
+        return self
+
+    def score_batch(self, features):
+        whitened = (as_template(features) - self.center) @ self.whitening
+        return 1 / (1 + np.sqrt(np.einsum('ij,ij->i', whitened, whitened)))
+
+
+@register
+class GaussianScorer(Scorer):
+    """One-class diagonal Gaussian: exp(-mean squared z-score / 2) around the enrollment mean"""
+
+    name = "gaussian"
+    params = ("center", "variance")
+
+    def fit(self, train_data):
+        train_data = as_template(train_data)
+        self.center = train_data.mean(axis=0)
+        self.variance = np.maximum(train_data.var(axis=0), VARIANCE_FLOOR)
+        return self
+
+    def score_batch(self, features):
+        z2 = (as_template(features) - self.center) ** 2 / self.variance
+        return np.exp(-z2.mean(axis=1) / 2)
+
+
+def benchmark(names=None, n_users=30, n_features=10, train_reps=20, test_reps=30, impostor_reps=5,
+              latency_runs=2000, seed=0):
+    """EER, single-attempt verify latency and template size for each scorer"""
+    from calibration import equal_error_rate
+    from train_auth import build_model
+    from verify_core import verify
+    from workload import synthetic_users
+
+    users = synthetic_users(n_users, n_features, train_reps + test_reps, seed)
+    results = {}
+    for name in names or sorted(SCORERS):
+        eers = []
+        for u in range(n_users):
+            model = build_model(users[u, :train_reps], scorer=name, calibrate=False)
+            genuine, _ = verify(users[u, train_reps:], model, 0)
+            impostor, _ = verify(np.delete(users, u, axis=0)[:, :impostor_reps].reshape(-1, n_features), model, 0)
+            eers.append(equal_error_rate(genuine, impostor)[0])
+
+        attempt = [users[0, -1]]
+        times = np.empty(latency_runs)
+        for i in range(latency_runs):
+            start = time.perf_counter_ns()
+            verify(attempt, model, 0)
+            times[i] = (time.perf_counter_ns() - start) / 1000
+        scorer = load_scorer(model)
+        results[name] = {
+            "eer": float(np.mean(eers)),
+            "p50_us": float(np.percentile(times, 50)),
+            "p99_us": float(np.percentile(times, 99)),
+            "template_bytes": int(scorer.nbytes() + model["mean"].nbytes + model["scale"].nbytes),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare scorers: EER on a synthetic population, verify latency, template size")
+    parser.add_argument("--scorer", action="append", choices=sorted(SCORERS), help="Only these scorers (repeatable)")
+    parser.add_argument("--users", type=int, default=30)
+    parser.add_argument("--features", type=int, default=10)
+    parser.add_argument("--train-reps", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = benchmark(args.scorer, args.users, args.features, args.train_reps, seed=args.seed)
+    print(f"{'scorer':<18}{'EER':>7}{'p50 µs':>9}{'p99 µs':>9}{'bytes':>8}")
+    for name, r in sorted(results.items(), key=lambda item: item[1]["eer"]):
+        print(f"{name:<18}{r['eer']:>7.3f}{r['p50_us']:>9.1f}{r['p99_us']:>9.1f}{r['template_bytes']:>8}")
@@ -0,0 +1,58 @@
+import numpy as np
+
+# Upper bound on the (attempts x template rows x features) block evaluated at once
+MAX_BLOCK_ELEMENTS = 1 << 20
+
+
+def as_template(train_data, dtype=None):
+    """Return template rows as a contiguous 2-D float array"""
+    if dtype is None:
+        dtype = np.float32 if np.asarray(train_data).dtype == np.float32 else np.float64
+    return np.ascontiguousarray(np.atleast_2d(train_data), dtype=dtype)
+
+
+def mean_distances(features, template):
+    """Mean Euclidean distance from each of N attempts to all M template rows"""
+    template = as_template(template)
+    features = as_template(features, dtype=template.dtype)
+    if features.shape[1] != template.shape[1]:
+        raise ValueError(f"Expected {template.shape[1]} features, got {features.shape[1]}")
+
+    n_attempts, n_features = features.shape
+    n_rows = template.shape[0]
+    out = np.empty(n_attempts, dtype=template.dtype)
+
+    # Score in blocks of attempts so huge histories run in bounded memory
+    block = max(1, MAX_BLOCK_ELEMENTS // max(1, n_rows * n_features))
+    for start in range(0, n_attempts, block):
+        diff = features[start:start + block, None, :] - template[None, :, :]
+        distances = np.sqrt(np.einsum('nmd,nmd->nm', diff, diff))
+        out[start:start + block] = distances.mean(axis=1)
+    return out
+
+
+def score_batch(features, template):
+    """Score N attempts against M template rows in one vectorized pass
+
+    Returns an array of N similarity scores, 1 / (1 + mean Euclidean distance),
+    matching the per-sample loop previously used by the lockscreen.
+    """
+    return 1 / (1 + mean_distances(features, template))
+
+
+
+def pairwise_distance_sums(a):
+    """Row sums of the self distance matrix of a, built in bounded row blocks"""
+    a = as_template(a)
+    n_rows = a.shape[0]
+    sq_norms = np.einsum('ij,ij->i', a, a)
+    sums = np.empty(n_rows, dtype=a.dtype)
+    block = max(1, MAX_BLOCK_ELEMENTS // max(1, n_rows))
+    for start in range(0, n_rows, block):
+        stop = min(start + block, n_rows)
+        sq = sq_norms[start:stop, None] - 2 * (a[start:stop] @ a.T) + sq_norms[None, :]
+        np.maximum(sq, 0, out=sq)
+        # Zero the diagonal so each row sum excludes the sample itself
+        sq[np.arange(stop - start), np.arange(start, stop)] = 0
+        sums[start:stop] = np.sqrt(sq, out=sq).sum(axis=1)
+    return sums
@@ -0,0 +1,116 @@
+import json
+import os
+import struct
+from mmap import mmap as map_file, ACCESS_READ
+import numpy as np
+
+# File names
+MODEL_FILE = "typing_model.kst"
+LEGACY_MODEL_FILE = "typing_model.pkl"
+
+# Layout: magic, format version, header length, JSON header, then raw arrays
+MAGIC = b"KSTPL\0"
+FORMAT_VERSION = 1
+PREFIX = struct.Struct("<6sHI")
+ALIGNMENT = 64  # Every array starts on a 64-byte boundary so it can be mapped directly
+
+
+class TemplateFormatError(ValueError):
+    """Raised when a file is not a readable keystroke template"""
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _split_model(model):
+    """Separate a model dict into raw arrays and JSON-serialisable metadata"""
+    arrays = {}
+    meta = {}
+    for key, value in model.items():
+        if key == "scaler":
+            # Fitted StandardScaler from older code paths: keep only its parameters
+            arrays["mean"] = value.mean_
+            arrays["scale"] = value.scale_
+        elif isinstance(value, np.ndarray):
+            arrays[key] = value
+        elif isinstance(value, np.generic):
+            meta[key] = value.item()
+        else:
+            meta[key] = value
+    return arrays, meta
+
+
+def save_template(path, model):
+    """Write a model dict as a versioned binary template (atomically)"""
+    arrays, meta = _split_model(model)
+    arrays = {key: np.ascontiguousarray(value) for key, value in arrays.items()}
+
+    entries = {key: {"dtype": value.dtype.str, "shape": list(value.shape), "offset": 0}
+               for key, value in arrays.items()}
+    header = {"version": FORMAT_VERSION, "arrays": entries, "meta": meta}
+
+    # Offsets depend on the header length and vice versa: grow until they agree
+    header_size = 0
+    while True:
+        offset = _aligned(PREFIX.size + header_size)
+        for key, value in arrays.items():
+            entries[key]["offset"] = offset
+            offset = _aligned(offset + value.nbytes)
+        header_bytes = json.dumps(header).encode()
+        if len(header_bytes) <= header_size:
+            break
+        header_size = _aligned(len(header_bytes))
+    header_bytes = header_bytes.ljust(header_size)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(PREFIX.pack(MAGIC, FORMAT_VERSION, header_size))
+        file.write(header_bytes)
+        for key, value in arrays.items():
+            file.seek(entries[key]["offset"])
+            file.write(value.tobytes())
+        file.truncate(max(offset, file.tell()))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_header(file, path):
+    prefix = file.read(PREFIX.size)
+    if len(prefix) != PREFIX.size:
+        raise TemplateFormatError(f"{path}: file too short")
+    magic, version, header_size = PREFIX.unpack(prefix)
+    if magic != MAGIC:
+        raise TemplateFormatError(f"{path}: not a keystroke template")
+    if version > FORMAT_VERSION:
+        raise TemplateFormatError(f"{path}: template version {version} is newer than supported {FORMAT_VERSION}")
+    return json.loads(file.read(header_size))
+
+
+def read_header(path):
+    """Read and validate only the template header"""
+    with open(path, "rb") as file:
+        return _read_header(file, path)
+
+
+def load_template(path, mmap=True):
+    """Open a template; arrays are views into one read-only mapping of the file unless mmap is False"""
+    with open(path, "rb") as file:
+        header = _read_header(file, path)
+        if mmap:
+            # One mapping for the whole file; it stays open as long as any array references it
+            buffer = map_file(file.fileno(), 0, access=ACCESS_READ)
+        else:
+            file.seek(0)
+            buffer = bytearray(file.read())
+    model = dict(header["meta"])
+    model["version"] = header["version"]
+    for key, entry in header["arrays"].items():
+        shape = tuple(entry["shape"])
+        count = int(np.prod(shape))
+        if count:
+            model[key] = np.frombuffer(buffer, dtype=entry["dtype"], count=count, offset=entry["offset"]).reshape(shape)
+        else:
+            model[key] = np.empty(shape, dtype=entry["dtype"])
+    return model
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from template import save_template, load_template
+from config_store import file_signature, get_config
+
+# Defaults
+TEMPLATE_DIR = "templates"
+INDEX_FILE = "index.json"
+LOCK_FILE = "index.lock"
+DEFAULT_USER = "default"
+CACHE_SIZE = 128  # Templates kept loaded at once
+
+
+def _file_stem(user_id):
+    return hashlib.sha1(user_id.encode()).hexdigest()[:16]
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on path shared with other processes, held for the with block"""
+    with open(path, "a+b") as file:
+        if os.name == "nt":
+            import msvcrt
+            file.seek(0)
+            # LK_LOCK retries for about 10 s, then raises OSError
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+
+class TemplateStore:
+    """Per-user keystroke templates behind an on-disk index and an LRU cache"""
+
+    def __init__(self, root=TEMPLATE_DIR, cache_size=CACHE_SIZE):
+        self.root = root
+        self.cache_size = cache_size
+        self.index_path = os.path.join(root, INDEX_FILE)
+        self.lock_path = os.path.join(root, LOCK_FILE)
+        self._index = None
+        self._index_signature = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _read_index(self):
+        # The index is always replaced whole, so a new inode or mtime means a new version
+        signature = file_signature(self.index_path)
+        if self._index is not None and signature == self._index_signature:
+            return
+        if signature is None:
+            self._index = {}
+        else:
+            with open(self.index_path, "r") as file:
+                self._index = json.load(file)
+        self._index_signature = signature
+
+    def _write_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self._index, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+        self._index_signature = file_signature(self.index_path)
+
+    def _entry(self, user_id):
+        if self._index is None:
+            self._read_index()
+        entry = self._index.get(user_id)
+        if entry is None:
+            # Another process may have enrolled the user since we last looked
+            self._read_index()
+            entry = self._index.get(user_id)
+        return entry
+
+    def journal_path(self, user_id):
+        """Append-only update journal belonging to the user's current template generation"""
+        entry = self._entry(user_id)
+        generation = entry["generation"] if entry else 0
+        return os.path.join(self.root, f"{_file_stem(user_id)}-{generation}.journal")
+
+    def path_for(self, user_id):
+        """Template file for a user, or None if the user is not enrolled"""
+        entry = self._entry(user_id)
+        return os.path.join(self.root, entry["file"]) if entry else None
+
+    def users(self):
+        self._read_index()
+        return sorted(self._index)
+
+    def get(self, user_id):
+        """Return a user's template, loading it on first use"""
+        with self._lock:
+            model = self._cache.get(user_id)
+            if model is not None:
+                self._cache.move_to_end(user_id)
+                self.hits += 1
+                return model
+
+            self.misses += 1
+            path = self.path_for(user_id)
+            if path is None:
+                raise KeyError(f"No template enrolled for user {user_id!r}")
+            model = load_template(path)
+            self._cache[user_id] = model
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+            return model
+
+    @contextmanager
+    def _locked_index(self):
+        """Hold the index against this process's threads and other processes, with it freshly read"""
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with _file_lock(self.lock_path):
+                self._read_index()
+                yield
+
+    def put(self, user_id, model):
+        """Save a user's template and record it in the index"""
+        with self._locked_index():
+            old_entry = self._index.get(user_id)
+            generation = old_entry["generation"] + 1 if old_entry else 1
+            # A fresh file per generation: a reader may still have the old one mapped
+            file_name = f"{_file_stem(user_id)}-{generation}.kst"
+            save_template(os.path.join(self.root, file_name), model)
+            self._index[user_id] = {"file": file_name, "generation": generation}
+            self._write_index()
+            self._cache.pop(user_id, None)
+            if old_entry:
+                # The new generation supersedes the old template and its update journal
+                old_journal = f"{_file_stem(user_id)}-{old_entry['generation']}.journal"
+                for name in (old_entry["file"], old_journal):
+                    try:
+                        os.remove(os.path.join(self.root, name))
+                    except OSError:
+                        pass
+
+    def refresh(self, user_id):
+        """Drop a cached template that another process has replaced since it was loaded; True if it was"""
+        with self._lock:
+            before = (self._index or {}).get(user_id)
+            self._read_index()
+            if self._index.get(user_id) != before:
+                self._cache.pop(user_id, None)
+                return True
+            return False
+
+    def sync(self):
+        """Drop every cached template replaced by another process; one stat when nothing changed"""
+        with self._lock:
+            before = self._index or {}
+            self._read_index()
+            if self._index is before:
+                return
+            for user_id in [user_id for user_id in self._cache if self._index.get(user_id) != before.get(user_id)]:
+                del self._cache[user_id]
+
+    def remove(self, user_id):
+        """Delete a user's template, its update journal and its index entry"""
+        with self._locked_index():
+            entry = self._index.pop(user_id, None)
+            if entry is None:
+                return
+            self._write_index()
+            self._cache.pop(user_id, None)
+            journal = f"{_file_stem(user_id)}-{entry['generation']}.journal"
+            for name in (entry["file"], journal):
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except OSError:
+                    pass
+
+    def stats(self):
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_default_store = None
+
+
+def get_store():
+    """Process-wide store rooted at the configured template directory"""
+    global _default_store
+    if _default_store is None:
+        _default_store = TemplateStore(get_config().get("template_dir"))
+    return _default_store
@@ -1,40 +1,35 @@
 import time
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity
-import pickle
-import msvcrt
 import sys
+from scoring import score_batch
+from scorers import DEFAULT_SCORER, get_scorer, EuclideanScorer
+from verify_core import fit_scaler, fold_scaler, scale_features, verify
+from calibration import calibrate_model
+from capture import KeystrokeBuffer
+from template_store import DEFAULT_USER, get_store
+from config_store import get_config
 
-# Constants
-PASSWORD = "sumanth"
-THRESHOLD = 0.10  # Reduced threshold for more lenient matching
+# Constants (password, fallback threshold, scorer and calibration target come from the config file run.py edits)
+PASSWORD = get_config().get("password")
+THRESHOLD = get_config().get("threshold")
 NUM_FEATURES = len(PASSWORD) - 1  # Number of inter-key intervals
+OUTLIER_IQR_FACTOR = 1.5  # Samples scoring below Q1 - factor * IQR are flagged as outliers
 
 def get_keystroke_times():
     """Capture the timing between keystrokes"""
-    times = []
-    typed = ""
-    last_time = None
+    # Console capture is Windows-only; importing it lazily keeps the constants cheap to import
+    import msvcrt
     
-    # Get the first character
-    char = msvcrt.getch().decode()
-    typed += char
-    sys.stdout.write(char)
-    last_time = time.time()
+    buffer = KeystrokeBuffer()
     
-    # Get remaining characters
-    while len(typed) < len(PASSWORD):
-        char = msvcrt.getch().decode()
-        current_time = time.time()
-        if last_time is not None:
-            times.append(current_time - last_time)
-        last_time = current_time
-        typed += char
-        sys.stdout.write(char)
+    while len(buffer) < len(PASSWORD):
+        char = msvcrt.getch()
+        # Timestamp before decoding or echoing so that work doesn't land in the interval
+        buffer.press(char.decode(), time.perf_counter_ns())
+        sys.stdout.write(char.decode())
     
     print()  # New line after password
-    return typed, times
+    return buffer.text, buffer.intervals()
 
 def collect_typing_data(password, n_attempts=5):
     data = []
@@ -58,39 +53,47 @@ def collect_typing_data(password, n_attempts=5):
     return np.array(data)
 
 def similarity_score(test_features, train_features):
-    # Compute average Euclidean distance across all samples
-    distances = [np.linalg.norm(test_features - train_sample) for train_sample in train_features]
-    avg_distance = np.mean(distances)
-    # Convert distance to similarity score
-    similarity = 1 / (1 + avg_distance)
-    return similarity
+    # Average Euclidean distance across all samples, converted to a similarity score
+    return score_batch(test_features, train_features)[0]
 
-def train_model():
-    print("Training phase:")
-    train_data = collect_typing_data(PASSWORD, n_attempts=5)
-    scaler = StandardScaler()
-    scaled_train_data = scaler.fit_transform(train_data)
-    
-    # Calculate self-similarity scores for training data
-    self_similarities = []
-    for i in range(len(scaled_train_data)):
-        test_sample = scaled_train_data[i:i+1]
-        remaining_samples = np.delete(scaled_train_data, i, axis=0)
-        sim = similarity_score(test_sample, remaining_samples)
-        self_similarities.append(sim)
+def leave_one_out_scores(scaled_train_data):
+    """Similarity of each training sample against all the other samples"""
+    return EuclideanScorer().leave_one_out(scaled_train_data)
+
+def flag_outliers(scores):
+    """Flag samples whose self-similarity falls far below the rest"""
+    q1, q3 = np.percentile(scores, [25, 75])
+    return scores < q1 - OUTLIER_IQR_FACTOR * (q3 - q1)
+
+def build_model(train_data, scorer=DEFAULT_SCORER, calibrate=True):
+    """Fit the scaler and scorer and derive self-similarity statistics from raw intervals"""
+    mean, scale = fit_scaler(train_data)
+    scaled_train_data = scale_features(train_data, mean, scale)
     
-    avg_self_similarity = np.mean(self_similarities)
-    min_self_similarity = np.min(self_similarities)
+    fitted = get_scorer(scorer)(-mean / scale).fit(scaled_train_data)
+    self_similarities = fitted.leave_one_out(scaled_train_data)
     
     model = {
         "train_data": scaled_train_data,
-        "scaler": scaler,
-        "avg_self_similarity": avg_self_similarity,
-        "min_self_similarity": min_self_similarity
+        "mean": mean,
+        "scale": scale,
+        "avg_self_similarity": np.mean(self_similarities),
+        "min_self_similarity": np.min(self_similarities),
+        "self_similarities": self_similarities,
+        "outliers": flag_outliers(self_similarities),
+        **fitted.serialize()
     }
+    fold_scaler(model)
+    return calibrate_model(model) if calibrate else model
+
+def train_model():
+    print("Training phase:")
+    train_data = collect_typing_data(PASSWORD, n_attempts=5)
+    model = build_model(train_data, get_config().get("scorer"))
+    avg_self_similarity = model["avg_self_similarity"]
+    min_self_similarity = model["min_self_similarity"]
     
-    with open("typing_model.pkl", "wb") as model_file:
-        pickle.dump(model, model_file)
+    get_store().put(DEFAULT_USER, model)
     
     print("\nModel trained and saved successfully!")
     print("\nYour typing pattern statistics:")
@@ -98,9 +101,14 @@ def train_model():
     print("Standard deviations:", [f"{t:.3f}s" for t in np.std(train_data, axis=0)])
     print(f"Average self-similarity score: {avg_self_similarity:.3f}")
     print(f"Minimum self-similarity score: {min_self_similarity:.3f}")
+    if "threshold" in model:
+        print(f"Calibrated threshold: {model['threshold']:.3f} "
+              f"(95% CI {model['threshold_low']:.3f}-{model['threshold_high']:.3f})")
+    if model["outliers"].any():
+        print("Outlier attempts:", [int(i) + 1 for i in np.flatnonzero(model["outliers"])])
     return model
 
-def verify_typing(model, scaler, train_data, password):
+def verify_typing(model, password):
     print("\nVerification phase:")
     input("Press Enter when ready to start typing your password.")
     print("Start typing...")
@@ -115,29 +123,26 @@ def verify_typing(model, scaler, train_data, password):
         print("Invalid typing pattern. Access Denied!")
         return
         
-    test_features = np.array([times])
-    test_features_scaled = scaler.transform(test_features)
-    similarity = similarity_score(test_features_scaled, train_data)
+    threshold = model.get("threshold", THRESHOLD)
+    similarities, accepted = verify([times], model, threshold)
+    similarity = similarities[0]
     
     print(f"\nYour typing intervals: {[f'{t:.3f}s' for t in times]}")
     print(f"Similarity score: {similarity:.2f}")
     
-    if similarity >= THRESHOLD:
+    if accepted[0]:
         print("Access Granted!")
     else:
         print("Access Denied!")
-        print(f"Required threshold: {THRESHOLD}")
+        print(f"Required threshold: {threshold:.3f}")
         print("Try typing with a more consistent rhythm.")
 
 if __name__ == "__main__":
     try:
-        with open("typing_model.pkl", "rb") as model_file:
-            model = pickle.load(model_file)
-            print("Model loaded successfully!")
-    except FileNotFoundError:
+        model = get_store().get(DEFAULT_USER)
+        print("Model loaded successfully!")
+    except KeyError:
         print("Model not found. Training a new model...")
         model = train_model()
         
-    train_data = model["train_data"]
-    scaler = model["scaler"]
-    verify_typing(model, scaler, train_data, PASSWORD)
\ No newline at end of file
+    verify_typing(model, PASSWORD)
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""Pure-NumPy verification core shared by the lockscreen, training and settings app.
+
+Keep this module's imports to numpy and the standard library: it sits on the
+lockscreen's cold-start path, which users wait on after every unlock event.
+"""
+import sys
+import time
+import numpy as np
+from metrics import span
+from scorers import CASCADE_BAND, CASCADE_STAGES, cascade_stats, load_scorer
+
+# Modules that must never be imported on the verification path
+FORBIDDEN_IMPORTS = ("sklearn", "scipy", "tkinter", "win32gui", "win32con", "keyboard", "msvcrt")
+VERIFY_PATH_MODULES = ("verify_core", "scorers", "template", "train_auth")
+IMPORT_BUDGET_SECONDS = 0.5
+REPORT_BAND = 0.1  # Band whose disagreements with full scoring --check-compiled reports
+SLOPPY_ROWS = 2  # Hesitant enrollment rows per user in --check-compiled's outlier-heavy population
+
+
+def fit_scaler(train_data):
+    """Per-feature mean and scale, matching sklearn's StandardScaler"""
+    train_data = np.asarray(train_data, dtype=np.float64)
+    mean = train_data.mean(axis=0)
+    scale = train_data.std(axis=0)
+    # Constant features are left unscaled rather than divided by zero
+    scale[scale == 0] = 1.0
+    return mean, scale
+
+
+def scale_features(features, mean, scale):
+    """Standardise raw interval vectors with a stored mean and scale"""
+    return (np.atleast_2d(np.asarray(features, dtype=np.float64)) - mean) / scale
+
+
+def fold_scaler(model):
+    """Store the scaler as a multiply-add (x * inv_scale + offset) in a freshly built model"""
+    scale = np.asarray(model["scale"], dtype=np.float64)
+    model["inv_scale"] = 1 / scale
+    model["offset"] = -np.asarray(model["mean"], dtype=np.float64) / scale
+    return model
+
+
+def standardize(features, model):
+    """Scale raw interval vectors with the model's folded scaler (or mean/scale for older templates)"""
+    features = np.atleast_2d(np.asarray(features, dtype=np.float64))
+    if "inv_scale" in model:
+        return features * model["inv_scale"] + model["offset"]
+    return (features - model["mean"]) / model["scale"]
+
+
+def decide(similarity, threshold):
+    """Accept when the similarity reaches the threshold"""
+    return similarity >= threshold
+
+
+def verify(features, model, threshold):
+    """Score raw interval vectors against a model; returns (similarities, accepted)"""
+    with span("verify_scale"):
+        scaled = standardize(features, model)
+    with span("verify_score"):
+        similarities = load_scorer(model).score_batch(scaled)
+    with span("verify_decide"):
+        accepted = decide(similarities, threshold)
+    return similarities, accepted
+
+
+def verify_decisions(features, model, threshold, band=CASCADE_BAND):
+    """Accept/reject raw interval vectors, exact-scoring only what the scorer's cheap stages leave open"""
+    with span("verify_scale"):
+        scaled = standardize(features, model)
+    with span("verify_decide_fast"):
+        return load_scorer(model).decide_batch(scaled, threshold, band)
+
+
+def check_compiled(n_users=20, n_features=10, train_reps=50, attempts=200, seed=0, band=REPORT_BAND, sloppy_rows=0):
+    """Compare precompiled verification with the original Euclidean rule
+
+    sloppy_rows enrollment rows per user are typed with hesitations, which
+    widens the template's spread. Returns (problems, share of exact decisions
+    settled by the O(d) bounds, cascade stats and disagreements with band).
+    """
+    from scoring import score_batch
+    from train_auth import build_model
+    from workload import synthetic_users
+
+    users = synthetic_users(n_users, n_features, train_reps + attempts, seed)
+    if sloppy_rows:
+        rng = np.random.default_rng(seed)
+        users[:, :sloppy_rows] *= rng.lognormal(np.log(3), 0.5, size=(n_users, sloppy_rows, n_features))
+    problems = []
+    cascade = dict.fromkeys(CASCADE_STAGES, 0)
+    bounds_settled = total = disagreements = 0
+    for u in range(n_users):
+        model = build_model(users[u, :train_reps], calibrate=False)
+        # Genuine attempts plus everyone else's
+        features = np.concatenate([users[u, train_reps:], np.delete(users, u, axis=0)[:, train_reps:].reshape(-1, n_features)])
+        reference = score_batch(scale_features(features, model["mean"], model["scale"]), model["train_data"])
+        similarities, accepted = verify(features, model, 0)
+        if not np.allclose(similarities, reference, rtol=1e-12, atol=0):
+            problems.append(f"User {u}: scores differ by up to {np.abs(similarities - reference).max():.3g}")
+        for threshold in np.quantile(reference, [0.05, 0.25, 0.5, 0.75, 0.95]):
+            expected = decide(reference, threshold)
+            cascade_stats(reset=True)
+            if (decide(similarities, threshold) != expected).any() or (verify_decisions(features, model, threshold, None) != expected).any():
+                problems.append(f"User {u}: decisions differ at threshold {threshold:.4f}")
+            bounds_settled += cascade_stats(reset=True)["centroid"]
+            total += len(features)
+            disagreements += int((verify_decisions(features, model, threshold, band) != expected).sum())
+            for stage, count in cascade_stats(reset=True).items():
+                if stage in cascade:
+                    cascade[stage] += count
+    cascade.update({f"{stage}_rate": cascade[stage] / total for stage in CASCADE_STAGES})
+    return problems, bounds_settled / total, {**cascade, "attempts": total, "disagreements": disagreements}
+
+
+def check_import_budget(modules=VERIFY_PATH_MODULES, budget=IMPORT_BUDGET_SECONDS):
+    """Import the verify path in a fresh interpreter; returns a list of problems"""
+    import subprocess
+    probe = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"for name in {list(modules)!r}:\n"
+        "    __import__(name)\n"
+        "print(time.perf_counter() - start)\n"
+        "print(' '.join(sorted(sys.modules)))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True)
+    if result.returncode != 0:
+        return [f"Import failed:\n{result.stderr}"]
+
+    elapsed, loaded = result.stdout.splitlines()[:2]
+    problems = []
+    for name in loaded.split():
+        if name.split(".")[0] in FORBIDDEN_IMPORTS:
+            problems.append(f"Verify path imports {name}")
+    if float(elapsed) > budget:
+        problems.append(f"Verify path took {float(elapsed):.3f}s to import (budget {budget:.3f}s)")
+    return problems
+
+
+if __name__ == "__main__":
+    if "--check-compiled" in sys.argv:
+        failed = False
+        for population, sloppy_rows in (("clean", 0), ("outlier-heavy", SLOPPY_ROWS)):
+            problems, fast_share, cascade = check_compiled(sloppy_rows=sloppy_rows)
+            for problem in problems:
+                print(f"❌ {population}: {problem}")
+            failed = failed or bool(problems)
+            if not problems:
+                print(f"✅ {population}: precompiled verification matches the original Euclidean rule "
+                      f"({fast_share:.0%} of decisions settled by the O(d) bounds)")
+            print(f"   opt-in band {REPORT_BAND}: " + ", ".join(f"{stage} {cascade[f'{stage}_rate']:.1%}" for stage in CASCADE_STAGES)
+                  + f"; {cascade['disagreements']} of {cascade['attempts']} decisions differ from full scoring")
+        if failed:
+            sys.exit(1)
+    if "--check-imports" in sys.argv:
+        start = time.perf_counter()
+        problems = check_import_budget()
+        for problem in problems:
+            print(f"❌ {problem}")
+        if problems:
+            sys.exit(1)
+        print(f"✅ Verify path import budget OK ({time.perf_counter() - start:.3f}s including interpreter start)")
@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+import numpy as np
+from template_store import DEFAULT_USER, get_store
+from config_store import get_config
+from verify_core import verify, verify_decisions
+from scorers import CASCADE_BAND, cascade_stats
+
+# Defaults
+HOST = "127.0.0.1"
+PORT = 8765
+BATCH_WINDOW = 0.002  # Seconds to wait for more requests before scoring a batch
+MAX_BATCH = 256
+LATENCY_HISTORY = 10000  # Recent request latencies kept for percentiles
+
+
+class VerificationService:
+    """Micro-batches concurrent verification requests into vectorized scoring calls"""
+
+    def __init__(self, store=None, threshold=None, batch_window=BATCH_WINDOW, max_batch=MAX_BATCH, config=None,
+                 band=CASCADE_BAND):
+        self.store = store or get_store()
+        self.threshold = threshold  # None: follow the config file's fallback threshold
+        self.config = config or get_config()
+        self.band = band  # Approximate cascade band for decision-only requests; None (default) keeps decisions exact
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+        self.requests = 0
+        self.batches = 0
+
+    async def submit(self, user_id, features, scores=True):
+        """Queue one timing vector and wait for (similarity, accepted); similarity is None if not requested"""
+        if not isinstance(user_id, str):
+            raise ValueError("user must be a string")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((user_id, features, future, time.perf_counter(), scores))
+        return await future
+
+    async def run(self):
+        """Batching loop: drain the queue, group by user, score each group at once"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                self.score(batch)
+            except Exception as e:
+                # Whatever went wrong, fail this batch's requests and keep serving
+                for item in batch:
+                    if not item[2].done():
+                        item[2].set_exception(e)
+
+    def score(self, batch):
+        # Settings and retrained templates take effect from the next batch; unchanged files cost a stat each
+        try:
+            self.store.sync()
+        except (OSError, ValueError):
+            pass  # An unreadable index: keep serving the templates already loaded
+        fallback = self.threshold if self.threshold is not None else self.config.get("threshold")
+        groups = {}
+        for item in batch:
+            groups.setdefault(item[0], []).append(item)
+
+        for user_id, items in groups.items():
+            try:
+                self.score_group(user_id, items, fallback)
+            except Exception as e:
+                # Fail this group's requests; the batching loop must keep running for everyone else
+                for item in items:
+                    if not item[2].done():
+                        item[2].set_exception(e)
+
+        now = time.perf_counter()
+        self.latencies.extend(now - item[3] for item in batch)
+        self.requests += len(batch)
+        self.batches += 1
+
+    def score_group(self, user_id, items, fallback):
+        model = self.store.get(user_id)
+
+        # A malformed vector fails its own request, not the whole group
+        n_features = model["train_data"].shape[1]
+        valid, vectors = [], []
+        for item in items:
+            try:
+                vector = np.asarray(item[1], dtype=np.float64)
+                if vector.shape != (n_features,):
+                    raise ValueError(f"Expected {n_features} intervals, got {vector.size}")
+            except (TypeError, ValueError) as e:
+                item[2].set_exception(ValueError(str(e)))
+                continue
+            valid.append(item)
+            vectors.append(vector)
+        if not valid:
+            return
+        items = valid
+        features = np.array(vectors)
+        threshold = model.get("threshold", fallback)
+        if any(item[4] for item in items):
+            similarities, accepted = verify(features, model, threshold)
+        else:
+            # Nobody asked for scores: let the scorer settle decisions the cheap way
+            accepted = verify_decisions(features, model, threshold, self.band)
+            similarities = [None] * len(items)
+        for item, similarity, ok in zip(items, similarities, accepted):
+            if not item[2].done():
+                item[2].set_result((None if similarity is None else float(similarity), bool(ok)))
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000
+        stats = {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "templates": self.store.stats(),
+            "cascade": cascade_stats(),
+        }
+        if len(latencies):
+            p50, p99 = np.percentile(latencies, [50, 99])
+            stats.update(p50_ms=float(p50), p99_ms=float(p99), max_ms=float(latencies.max()))
+        return stats
+
+    async def handle_connection(self, reader, writer):
+        """One JSON object per line in, one JSON object per line out"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = None
+                try:
+                    request = json.loads(line)
+                    if request.get("cmd") == "stats":
+                        response = self.stats()
+                    else:
+                        user_id = request.get("user", DEFAULT_USER)
+                        if not isinstance(user_id, str):
+                            raise ValueError("user must be a string")
+                        similarity, accepted = await self.submit(user_id, request["features"], request.get("scores", True))
+                        response = {"user": user_id, "accepted": accepted}
+                        if similarity is not None:
+                            response["similarity"] = similarity
+                except KeyError as e:
+                    response = {"error": f"Unknown user or missing field: {e.args[0]}"}
+                except Exception as e:
+                    response = {"error": str(e)}
+                if isinstance(request, dict) and "id" in request:
+                    response["id"] = request["id"]
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host=HOST, port=PORT, unix_path=None, band=CASCADE_BAND):
+    service = VerificationService(band=band)
+    batcher = asyncio.create_task(service.run())
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle_connection, path=unix_path)
+        print(f"🔐 Verification daemon listening on {unix_path}")
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        print(f"🔐 Verification daemon listening on {host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher.cancel()
+
+
+class VerifyClient:
+    """Blocking client for the verification daemon"""
+
+    def __init__(self, host=HOST, port=PORT, unix_path=None, timeout=5):
+        import socket
+        if unix_path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(unix_path)
+        else:
+            self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.file = self.sock.makefile("rwb")
+
+    def request(self, payload):
+        self.file.write(json.dumps(payload).encode() + b"\n")
+        self.file.flush()
+        return json.loads(self.file.readline())
+
+    def verify(self, features, user_id=DEFAULT_USER):
+        return self.request({"user": user_id, "features": list(features)})
+
+    def stats(self):
+        return self.request({"cmd": "stats"})
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+async def load_test(host, port, unix_path, user_id, features, n_requests, concurrency):
+    """Fire concurrent requests to exercise batching; returns client-side latencies"""
+    latencies = []
+    payload = json.dumps({"user": user_id, "features": features}).encode() + b"\n"
+
+    async def worker(count):
+        if unix_path:
+            reader, writer = await asyncio.open_unix_connection(unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        for _ in range(count):
+            start = time.perf_counter()
+            writer.write(payload)
+            await writer.drain()
+            await reader.readline()
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+
+    per_worker = -(-n_requests // concurrency)
+    await asyncio.gather(*(worker(per_worker) for _ in range(concurrency)))
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless keystroke verification daemon")
+    parser.add_argument("mode", choices=["serve", "client", "stats", "load"], nargs="?", default="serve")
+    parser.add_argument("features", nargs="*", type=float, help="Inter-key intervals in seconds")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", help="Unix socket path instead of TCP")
+    parser.add_argument("--user", default=DEFAULT_USER)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--band", type=float, default=CASCADE_BAND,
+                        help="Opt-in: decide decision-only requests by an estimate outside this relative band "
+                             "around the threshold (faster, but can reject attempts full scoring accepts)")
+    args = parser.parse_intermixed_args()
+
+    if args.mode == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, args.band))
+        except KeyboardInterrupt:
+            pass
+    elif args.mode == "load":
+        start = time.perf_counter()
+        latencies = asyncio.run(load_test(args.host, args.port, args.unix, args.user,
+                                          args.features, args.requests, args.concurrency)) * 1000
+        elapsed = time.perf_counter() - start
+        print(f"{len(latencies)} requests in {elapsed:.2f}s ({len(latencies) / elapsed:.0f} req/s)")
+        print(f"p50 {np.percentile(latencies, 50):.2f} ms, p99 {np.percentile(latencies, 99):.2f} ms")
+    else:
+        client = VerifyClient(args.host, args.port, args.unix)
+        try:
+            response = client.stats() if args.mode == "stats" else client.verify(args.features, args.user)
+        finally:
+            client.close()
+        print(json.dumps(response, indent=2))
+        if "error" in response:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
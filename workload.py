@@ -0,0 +1,189 @@
+import argparse
+import glob
+import json
+import os
+import time
+import numpy as np
+
+# Defaults
+USERS = 1000
+GENUINE_PER_USER = 100
+IMPOSTOR_PER_USER = 20
+CHUNK_ROWS = 1 << 20  # Attempts per .npy shard
+USER_BLOCK = 1024  # Users generated together; impostors are drawn from the same block
+FATIGUE = 0.15  # Up to +15% slower intervals by a user's last attempt
+OUTLIER_RATE = 0.01  # Share of intervals replaced by a hesitation
+OUTLIER_FACTOR = 3.0  # Median slowdown of a hesitation
+MANIFEST = "manifest.json"
+
+
+class UserModels:
+    """Per-user log-normal interval models for one block of users
+
+    Each user has a typing speed (median interval), a per-position rhythm, a
+    consistency (log-space sigma) and a fatigue rate. Everything is derived
+    from (seed, block), so any block can be regenerated on its own.
+    """
+
+    def __init__(self, seed, block, n_users, n_features, fatigue=FATIGUE):
+        rng = np.random.default_rng([seed, 0, block])
+        self.speed = rng.lognormal(np.log(0.18), 0.35, size=(n_users, 1))
+        self.rhythm = rng.lognormal(0, 0.3, size=(n_users, n_features))
+        self.sigma = rng.uniform(0.1, 0.35, size=(n_users, 1))
+        self.fatigue = rng.uniform(0, fatigue, size=(n_users, 1))
+
+    def sample(self, rng, typist, progress, outlier_rate=OUTLIER_RATE):
+        """Intervals typed by each typist at the given session progress (0..1)"""
+        median = self.speed[typist] * self.rhythm[typist]
+        intervals = median * np.exp(self.sigma[typist] * rng.standard_normal(median.shape))
+        intervals *= 1 + self.fatigue[typist] * progress[:, None]
+        if outlier_rate:
+            hesitations = rng.random(intervals.shape) < outlier_rate
+            intervals[hesitations] *= rng.lognormal(np.log(OUTLIER_FACTOR), 0.5, size=int(hesitations.sum()))
+        return intervals
+
+
+def synthetic_users(n_users, n_features, reps, seed=0):
+    """Raw interval attempts for a population of typists, shape (users, reps, features)
+
+    Steady typists (no fatigue, no hesitations) from the same models as the
+    workload, for scorer comparisons and self-checks.
+    """
+    models = UserModels(seed, 0, n_users, n_features, fatigue=0)
+    rng = np.random.default_rng([seed, 1])
+    typist = np.repeat(np.arange(n_users), reps)
+    return models.sample(rng, typist, np.zeros(len(typist)), outlier_rate=0).reshape(n_users, reps, n_features)
+
+
+def generate(password, n_users=USERS, genuine=GENUINE_PER_USER, impostor=IMPOSTOR_PER_USER, seed=0,
+             fatigue=FATIGUE, outlier_rate=OUTLIER_RATE, user_block=USER_BLOCK, dtype=np.float64):
+    """Yield (features, labels) per block of users
+
+    labels has columns (claimed user, typist); an attempt is genuine when they
+    match. Impostors type the claimed user's password with their own model.
+    Memory is bounded by one block: user_block * (genuine + impostor) attempts.
+    """
+    n_features = len(password) - 1
+    if n_features < 1:
+        raise ValueError("Password needs at least two characters")
+    if impostor and n_users < 2:
+        raise ValueError("Impostor attempts need at least two users")
+    starts = list(range(0, n_users, user_block)) + [n_users]
+    if len(starts) > 2 and n_users - starts[-2] == 1:
+        # A lone final user would have nobody to impersonate them; fold them into the previous block
+        del starts[-2]
+    for block, (first, end) in enumerate(zip(starts, starts[1:])):
+        size = end - first
+        models = UserModels(seed, block, size, n_features, fatigue)
+        rng = np.random.default_rng([seed, 1, block])
+
+        claimed = np.repeat(np.arange(size), genuine + impostor)
+        typist = claimed.copy()
+        if impostor:
+            # Impostor slots get a different user of the same block
+            slots = (np.arange(len(claimed)) % (genuine + impostor)) >= genuine
+            typist[slots] = (claimed[slots] + rng.integers(1, size, size=int(slots.sum()))) % size
+        progress = np.tile(np.arange(genuine + impostor) / max(genuine + impostor - 1, 1), size)
+
+        features = models.sample(rng, typist, progress, outlier_rate).astype(dtype, copy=False)
+        labels = np.stack([claimed + first, typist + first], axis=1).astype(np.int32)
+        yield features, labels
+
+
+def write_shards(outdir, password, chunk_rows=CHUNK_ROWS, **options):
+    """Stream generated attempts into fixed-size .npy shards; returns the manifest"""
+    os.makedirs(outdir, exist_ok=True)
+    shards = []
+    pending_features, pending_labels, pending_rows = [], [], 0
+
+    def flush(rows):
+        nonlocal pending_features, pending_labels, pending_rows
+        features = np.concatenate(pending_features)
+        labels = np.concatenate(pending_labels)
+        name = f"attempts-{len(shards):05d}"
+        np.save(os.path.join(outdir, f"{name}.npy"), features[:rows])
+        np.save(os.path.join(outdir, f"{name}.labels.npy"), labels[:rows])
+        shards.append({"name": name, "rows": int(rows)})
+        pending_features, pending_labels = [features[rows:]], [labels[rows:]]
+        pending_rows -= rows
+
+    total = 0
+    for features, labels in generate(password, **options):
+        pending_features.append(features)
+        pending_labels.append(labels)
+        pending_rows += len(features)
+        total += len(features)
+        while pending_rows >= chunk_rows:
+            flush(chunk_rows)
+    if pending_rows:
+        flush(pending_rows)
+
+    manifest = {
+        "password_length": len(password),
+        "n_features": len(password) - 1,
+        "attempts": total,
+        "chunk_rows": chunk_rows,
+        "shards": shards,
+        "options": {key: (np.dtype(value).name if key == "dtype" else value) for key, value in options.items()},
+    }
+    with open(os.path.join(outdir, MANIFEST), "w") as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def is_workload(path):
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def read_shards(outdir, mmap=True):
+    """Yield (features, labels) for each shard of a generated workload"""
+    for path in sorted(glob.glob(os.path.join(outdir, "attempts-*[0-9].npy"))):
+        labels_path = path[:-len(".npy")] + ".labels.npy"
+        mode = "r" if mmap else None
+        yield np.load(path, mmap_mode=mode), np.load(labels_path, mmap_mode=mode)
+
+
+def write_log(path, outdir, line_format="%Y-%m-%d %H:%M:%S"):
+    """Replay a workload as lockscreen log lines (genuine attempts unlock) for the monitoring path"""
+    start = time.time()
+    lines = 0
+    with open(path, "w") as file:
+        for _, labels in read_shards(outdir):
+            genuine = labels[:, 0] == labels[:, 1]
+            out = []
+            for ok in genuine.tolist():
+                stamp = time.strftime(line_format, time.localtime(start + lines))
+                if ok:
+                    out.append(f"{stamp},000 - Successful authentication\n{stamp},000 - System unlocked successfully\n")
+                else:
+                    out.append(f"{stamp},000 - Failed authentication attempt: Incorrect password or typing pattern (Score: 0.00) doesn't match!\n")
+                lines += 1
+            file.write("".join(out))
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic keystroke workloads as .npy shards")
+    parser.add_argument("outdir")
+    parser.add_argument("--password", default="sumanth")
+    parser.add_argument("--users", type=int, default=USERS)
+    parser.add_argument("--genuine", type=int, default=GENUINE_PER_USER, help="Genuine attempts per user")
+    parser.add_argument("--impostor", type=int, default=IMPOSTOR_PER_USER, help="Impostor attempts against each user")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fatigue", type=float, default=FATIGUE)
+    parser.add_argument("--outliers", type=float, default=OUTLIER_RATE)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--float32", action="store_true", help="Store intervals as float32 to halve disk use")
+    parser.add_argument("--log", help="Also write the attempts as lockscreen log lines to this file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = write_shards(args.outdir, args.password, args.chunk_rows, n_users=args.users, genuine=args.genuine,
+                            impostor=args.impostor, seed=args.seed, fatigue=args.fatigue, outlier_rate=args.outliers,
+                            dtype=np.float32 if args.float32 else np.float64)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {manifest['attempts']:,} attempts in {len(manifest['shards'])} shards "
+          f"({elapsed:.2f}s, {manifest['attempts'] / elapsed:,.0f} attempts/s) -> {args.outdir}")
+    if args.log:
+        lines = write_log(args.log, args.outdir)
+        print(f"📜 {lines:,} attempts written to {args.log}")